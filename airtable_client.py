@@ -0,0 +1,150 @@
+import json
+import logging
+import posixpath
+import random
+import threading
+import time
+
+import airtable
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+import metrics
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class AirtableError(Exception):
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def isRetryable(method, status = None, connected = True):
+    """Whether a failed Airtable request may be sent again.
+
+    ``status`` is the status of an error response, or None when the request
+    failed on the network; ``connected`` is False when no connection was
+    made, so Airtable never saw the request.
+    """
+    if method == "POST":
+        # POST 不是冪等的：ReadTimeout 或 5xx 時紀錄可能已經建立，只重送確定沒送到 Airtable 的請求
+        return status == 429 or (status is None and not connected)
+    return status is None or status in RETRY_STATUS
+
+
+def isValidationError(e):
+    """True when Airtable rejected the request for its content (a 4xx such as 422), not for the rate limit."""
+    return isinstance(e, AirtableError) and 400 <= e.status_code < 500 and e.status_code != 429
+
+
+def isConnectFailure(e):
+    """True when ``e`` (a requests exception) was raised before the request was sent.
+
+    Only ConnectTimeout and a failure to open the connection qualify; other
+    ConnectionErrors such as "Connection aborted" can follow a sent body.
+    """
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(e, requests.exceptions.ConnectionError) or not e.args:
+        return False
+    reason = e.args[0]
+    if isinstance(reason, urllib3.exceptions.MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+class AirtableClient(airtable.Airtable):
+    """airtable.Airtable with a shared request budget, retries and bulk endpoints.
+
+    Every request goes through one token bucket, so all threads of a worker
+    share the per-base budget. Failed requests are retried with jittered
+    exponential backoff: GET and DELETE on 429, 5xx and network errors, POST
+    only on 429 and when the connection could not be opened, since a create
+    that reached Airtable would be duplicated by a retry. Requests are sent on one keep-alive
+    connection pool (one ``requests.Session`` per thread) so TLS connections
+    are reused between calls and the client can be shared across threads.
+    """
+
+    MAX_BATCH_SIZE = 10
+    OPERATIONS = {"GET": "get", "POST": "create", "PATCH": "update", "PUT": "update", "DELETE": "delete"}
+
+    def __init__(self, base_id, api_key, rate = 5, max_retries = 3, backoff = 0.5, max_backoff = 8, pool_size = 10, timeout = 10, api_url = None):
+        super().__init__(base_id, api_key)
+        if api_url:
+            # 例如 http://127.0.0.1:8001/v0，壓力測試時指向本機 stub
+            self.base_url = posixpath.join(api_url, base_id)
+        self._adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = pool_size)
+        self._local = threading.local()
+        self.timeout = timeout
+        self.rate_limiter = TokenBucket(rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    @property
+    def session(self):
+        # requests.Session 不保證 thread-safe，每個 thread 各用一個 Session，共用同一個連線池
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+        return session
+
+    # 覆寫 airtable.Airtable 的 private __request，所有 get/create/delete 都會經過這裡
+    def _Airtable__request(self, method, url, params = None, payload = None):
+        attempt = 0
+        while True:
+            waited = self.rate_limiter.acquire()
+            metrics.AIRTABLE_WAIT_SECONDS.observe(waited)
+            if waited > 0:
+                logger.debug("airtable %s %s waited %.3fs for rate limit", method, url, waited)
+            try:
+                return self._send(method, url, params, payload)
+            except (AirtableError, requests.exceptions.RequestException) as e:
+                if not self._retryable(method, e) or attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                logger.warning("airtable %s %s failed (%s), retry in %.2fs", method, url, e, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _retryable(self, method, e):
+        if isinstance(e, AirtableError):
+            return isRetryable(method, status = e.status_code)
+        return isRetryable(method, connected = not isConnectFailure(e))
+
+    def _send(self, method, url, params, payload):
+        if params and "fields" in params:
+            # airtable.Airtable 送出的是 fields=...，Airtable API 的欄位篩選要用 fields[]=...
+            params = dict(params)
+            params["fields[]"] = params.pop("fields")
+        headers = {"Content-type": "application/json"} if payload is not None else None
+        operation = self.OPERATIONS.get(method, method)
+        try:
+            with metrics.AIRTABLE_SECONDS.time(operation = operation):
+                r = self.session.request(method,
+                                         posixpath.join(self.base_url, url),
+                                         params = params,
+                                         data = payload,
+                                         headers = headers,
+                                         timeout = self.timeout)
+        except requests.exceptions.RequestException as e:
+            metrics.ERRORS.inc(source = "airtable", type = type(e).__name__)
+            raise
+        if r.status_code == requests.codes.ok:
+            return r.json(object_pairs_hook = self._dict_class)
+        metrics.ERRORS.inc(source = "airtable", type = str(r.status_code))
+        raise AirtableError(r.status_code, r.text)
+
+    def batch_create(self, table_name, records):
+        # Airtable 一次最多建立 10 筆
+        payload = json.dumps({"records": [{"fields": record} for record in records]})
+        return self._Airtable__request('POST', table_name, payload = payload)["records"]
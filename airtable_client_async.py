@@ -0,0 +1,107 @@
+"""aiohttp counterpart of airtable_client, kept apart so the sync bot never imports aiohttp."""
+import asyncio
+import logging
+import random
+from urllib.parse import quote
+
+import aiohttp
+
+import metrics
+from airtable_client import AirtableError, isRetryable
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAirtable:
+    """Minimal aiohttp client for the Airtable REST calls the bot makes.
+
+    Shares the request budget and retry policy of AirtableClient: every
+    request waits for the token bucket, and failed requests are retried
+    with jittered exponential backoff where ``isRetryable`` allows it.
+    """
+
+    API_URL = "https://api.airtable.com/v0/"
+    OPERATIONS = {"GET": "get", "POST": "create", "DELETE": "delete"}
+
+    def __init__(self, base_id, api_key, api_url = None, rate = 5, max_retries = 3, backoff = 0.5, max_backoff = 8):
+        self.base_url = (api_url or self.API_URL).rstrip("/") + "/" + base_id + "/"
+        self.headers = {"Authorization": "Bearer " + api_key}
+        self.rate_limiter = TokenBucket(rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers = self.headers)
+        return self._session
+
+    async def _request(self, method, url, **kwargs):
+        attempt = 0
+        while True:
+            waited = await self.rate_limiter.acquireAsync()
+            metrics.AIRTABLE_WAIT_SECONDS.observe(waited)
+            try:
+                return await self._send(method, url, **kwargs)
+            except AirtableError as e:
+                retryable = isRetryable(method, status = e.status_code)
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # 連線建立前就失敗時 Airtable 不會收到請求
+                connected = not isinstance(e, (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError))
+                retryable = isRetryable(method, connected = connected)
+                error = e
+            if not retryable or attempt >= self.max_retries:
+                raise error
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            logger.warning("airtable %s %s failed (%r), retry in %.2fs", method, url, error, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, method, url, **kwargs):
+        try:
+            with metrics.AIRTABLE_SECONDS.time(operation = self.OPERATIONS.get(method, method)):
+                async with self._get_session().request(method, url, **kwargs) as res:
+                    if res.status >= 400:
+                        metrics.ERRORS.inc(source = "airtable", type = str(res.status))
+                        raise AirtableError(res.status, await res.text())
+                    return await res.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            metrics.ERRORS.inc(source = "airtable", type = type(e).__name__)
+            raise
+
+    async def get(self, table_name, fields = [], filter_by_formula = None, offset = None, page_size = 0, max_records = 0):
+        params = [("fields[]", field) for field in fields]
+        if filter_by_formula is not None:
+            params.append(("filterByFormula", filter_by_formula))
+        if offset is not None:
+            params.append(("offset", offset))
+        if page_size:
+            params.append(("pageSize", page_size))
+        if max_records:
+            params.append(("maxRecords", max_records))
+        return await self._request("GET", self.base_url + quote(table_name), params = params)
+
+    async def iterate(self, table_name, fields = [], filter_by_formula = None, page_size = 0, max_records = 0):
+        # 依 offset 一頁一頁取，呼叫端停止迭代後就不再取下一頁
+        offset = None
+        while True:
+            res = await self.get(table_name, fields = fields, filter_by_formula = filter_by_formula,
+                                 offset = offset, page_size = page_size, max_records = max_records)
+            for record in res["records"]:
+                yield record
+            offset = res.get("offset")
+            if offset is None:
+                break
+
+    async def create(self, table_name, data):
+        return await self._request("POST", self.base_url + quote(table_name), json = {"fields": data})
+
+    async def delete(self, table_name, record_id):
+        return await self._request("DELETE", self.base_url + quote(table_name) + "/" + record_id)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
@@ -0,0 +1,546 @@
+import asyncio
+import logging
+import json
+import os
+import time
+from datetime import datetime
+from datetime import timedelta
+
+import config
+import context_store
+
+logging.basicConfig(level=logging.WARNING)
+env = config.Env()
+logging.getLogger("ewc.requests").setLevel(env.getChoice('REQUEST_LOG_LEVEL', 'INFO', config.LOG_LEVELS))
+
+SLACK_BOT_TOKEN = env.require('SLACK_BOT_TOKEN')
+SLACK_SIGNING_SECRET = env.require('SLACK_SIGNING_SECRET')
+AIRTABLE_API_KEY = env.require('AIRTABLE_API_KEY')
+AIRTABLE_BASE = env.require('AIRTABLE_BASE')
+AIRTABLE_NAME = env.require('AIRTABLE_NAME')
+PROXY_URL = env.require('PROXY_URL')
+START_TIME, END_TIME = env.requireDateRange('START_TIME', 'END_TIME')
+MINUS_DAY = env.require('MINUS_DAY', int)
+UTC_OFFSET = env.getInt('UTC_OFFSET', 8)
+UPLOADED_DATE_CACHE_TTL = env.getInt('UPLOADED_DATE_CACHE_TTL', 600)
+UPLOADED_DATE_CACHE_SIZE = env.getInt('UPLOADED_DATE_CACHE_SIZE', 2000)
+DEDUPE_TTL = env.getInt('DEDUPE_TTL', 600)
+FILE_INFO_CACHE_TTL = env.getInt('FILE_INFO_CACHE_TTL', 300)
+CONTEXT_STORE = env.get('CONTEXT_STORE', 'inline', context_store.checkSpec)
+CONTEXT_TTL = env.getInt('CONTEXT_TTL', 7 * 24 * 3600)
+REQUEST_LOG_SAMPLE_RATE = env.getFloat('REQUEST_LOG_SAMPLE_RATE', 0.1)
+REQUEST_LOG_REDACT_URLS = env.get('REQUEST_LOG_REDACT_URLS', '1') == '1'
+# staged: 依序顯示三個階段；single: 一次顯示所有欄位，送出時檢查日期
+MODAL_MODE = env.getChoice('MODAL_MODE', 'staged', ['staged', 'single'])
+# single 模式送出時最多等幾秒查詢已上傳日期，超過就先 ack，由 insertRecord 檢查後私訊通知
+SUBMISSION_CHECK_TIMEOUT = env.getFloat('SUBMISSION_CHECK_TIMEOUT', 2)
+# 壓力測試時把 Slack / Airtable API 指向本機 stub (bench/load_test.py)
+SLACK_API_URL = env.get('SLACK_API_URL', 'https://www.slack.com/api/')
+AIRTABLE_API_URL = env.get('AIRTABLE_API_URL')
+# 可以用 /ewc stats all 查看排行榜的使用者，以逗號分隔
+ADMIN_USER_IDS = set(filter(None, env.get('ADMIN_USER_IDS', '').split(',')))
+STATS_REBUILD_INTERVAL = env.getInt('STATS_REBUILD_INTERVAL', 3600)
+# 被 Slack 回 429 或連線中斷時最多重送幾次
+SLACK_MAX_RETRIES = env.getInt('SLACK_MAX_RETRIES', 2)
+WEB_CONCURRENCY = env.getInt('WEB_CONCURRENCY', 1)
+# Airtable 每個 base 5 req/s (AIRTABLE_RATE_LIMIT)，其中 AIRTABLE_BACKGROUND_RATE_LIMIT 留給背景的全表掃描
+# (/ewc stats 重建)，其餘給使用者的請求；兩份額度各自由所有 gunicorn worker 平分，
+# 背景掃描只會等自己的額度，不會讓使用者的請求排隊
+AIRTABLE_TOTAL_RATE_LIMIT = env.getFloat('AIRTABLE_RATE_LIMIT', 5)
+AIRTABLE_BACKGROUND_RATE_LIMIT = env.getFloat('AIRTABLE_BACKGROUND_RATE_LIMIT', 1)
+env.expect(0 < AIRTABLE_BACKGROUND_RATE_LIMIT < AIRTABLE_TOTAL_RATE_LIMIT,
+           "AIRTABLE_BACKGROUND_RATE_LIMIT must be above 0 and below AIRTABLE_RATE_LIMIT")
+AIRTABLE_RATE_LIMIT = (AIRTABLE_TOTAL_RATE_LIMIT - AIRTABLE_BACKGROUND_RATE_LIMIT) / WEB_CONCURRENCY
+AIRTABLE_BACKGROUND_RATE_LIMIT /= WEB_CONCURRENCY
+AIRTABLE_MAX_RETRIES = env.getInt('AIRTABLE_MAX_RETRIES', 3)
+# fast: 啟動時不呼叫 auth.test，改在背景驗證 token (冷啟動時第一個請求才來得及 ack)；eager: 啟動時就驗證
+STARTUP_MODE = env.getChoice('STARTUP_MODE', 'fast', ['fast', 'eager'])
+# auth.test 結果的快取檔，重新啟動時直接沿用
+SLACK_AUTH_CACHE = env.get('SLACK_AUTH_CACHE')
+# SQLite mirror 與 bulk create 只有 app_run 有，設定了卻不會生效，啟動時就報錯
+for name in ('AIRTABLE_MIRROR_PATH', 'AIRTABLE_MIRROR_SYNC_INTERVAL', 'AIRTABLE_BATCH_SIZE', 'AIRTABLE_BATCH_LATENCY_MS'):
+    env.unsupported(name, "in async mode, unset it or run app_run")
+# LISTENER_WORKERS、ACK_WORKERS、AIRTABLE_POOL_SIZE、SLACK_POOL_SIZE 是 app_run 的 thread / 連線數，
+# async 模式所有請求都在同一個 event loop 上執行，不需要也不會讀取
+env.check()
+
+import aiohttp
+from aiohttp import web
+from slack_bolt.async_app import AsyncApp
+from slack_bolt import BoltResponse
+from slack_bolt.adapter.aiohttp import to_bolt_request, to_aiohttp_response
+from slack_client import TierLimiter
+from slack_client_async import AsyncInstrumentedWebClient, asyncRetryHandlers, primeAuthorization
+from slack_dispatch import AsyncSlackDispatch
+import metrics
+from slack_sdk.errors import SlackApiError
+
+app = AsyncApp(
+    client = AsyncInstrumentedWebClient(
+        token = SLACK_BOT_TOKEN,
+        base_url = SLACK_API_URL,
+        retry_handlers = asyncRetryHandlers(SLACK_MAX_RETRIES),
+        rate_limiter = TierLimiter(WEB_CONCURRENCY)
+    ),
+    signing_secret = SLACK_SIGNING_SECRET
+)
+
+from airtable_client_async import AsyncAirtable
+
+at = AsyncAirtable(
+    AIRTABLE_BASE,
+    AIRTABLE_API_KEY,
+    api_url = AIRTABLE_API_URL,
+    rate = AIRTABLE_RATE_LIMIT,
+    max_retries = AIRTABLE_MAX_RETRIES
+)
+# 背景全表掃描用的 client，有自己的 token bucket
+backgroundAt = AsyncAirtable(
+    AIRTABLE_BASE,
+    AIRTABLE_API_KEY,
+    api_url = AIRTABLE_API_URL,
+    rate = AIRTABLE_BACKGROUND_RATE_LIMIT,
+    max_retries = AIRTABLE_MAX_RETRIES
+)
+
+from ttl_cache import TTLCache
+import templates
+from request_log import RequestLogger
+import slack_files
+from idempotency import Deduplicator
+from campaign import Campaign
+from bot_logic import BotLogic, isNotRepeat, uploadedDateQuery
+from stats import CampaignStats
+from single_flight import AsyncSingleFlight
+
+CAMPAIGN = Campaign.fromConfig(START_TIME, END_TIME, MINUS_DAY, UTC_OFFSET)
+DATE_HINT_BLOCK = templates.dateHintBlock(CAMPAIGN.hint_text)
+
+# /ewc stats 用的統計，啟動時掃描一次整個 table，之後隨新增/刪除更新
+campaignStats = CampaignStats()
+
+# 每位使用者已上傳日期的快取，新增/刪除紀錄時直接更新
+uploadedDateCache = TTLCache(maxsize = UPLOADED_DATE_CACHE_SIZE, ttl = UPLOADED_DATE_CACHE_TTL)
+
+# 開啟視窗時先在背景查詢已上傳日期，同一位使用者同時只會有一個查詢
+uploadedDateFlight = AsyncSingleFlight("uploaded_dates")
+
+# Slack 重送 (X-Slack-Retry-Num) 或重複送出同一個 view 時直接 ack
+deduplicator = Deduplicator(ttl = DEDUPE_TTL)
+
+# 按鈕 value / private_metadata 只帶 key，檔案資訊留在 server
+contextStore = context_store.fromConfig(CONTEXT_STORE, CONTEXT_TTL)
+CONTEXT_EXPIRED_TEXT = "上傳資料已過期，請重新上傳一次圖片"
+
+requestLogger = RequestLogger(sample_rate = REQUEST_LOG_SAMPLE_RATE, redact = REQUEST_LOG_REDACT_URLS)
+
+# 日期檢查、已上傳日期快取與 /ewc stats 的邏輯與 app_run 共用
+logic = BotLogic(CAMPAIGN, contextStore, uploadedDateCache, campaignStats, requestLogger, ADMIN_USER_IDS)
+
+# files_info 只保留用得到的欄位
+fileInfoCache = TTLCache(maxsize = 500, ttl = FILE_INFO_CACHE_TTL)
+
+async def insertRecord(client, record, userId, contextKey, logger):
+    try:
+        dateList = await queryUploadedDate(logger, userId)
+        if isNotRepeat(logger, record["Date"], dateList) and logic.isNotOver(logger, record["Date"]):
+            logger.debug(record)
+            res = await at.create(AIRTABLE_NAME, record)
+            logic.addUploadedDate(userId, record["Date"])
+            campaignStats.add(userId, record["Date"], record["Duration"])
+            recordInfo = {
+                "id":res["id"],
+                "date": record["Date"]
+            }
+            recordInfoString = json.dumps(recordInfo)
+
+            await client.chat_postMessage(
+                channel =  userId,
+                text = "上傳成功囉，本次上傳紀錄如下",
+                attachments = templates.recordAttachments(record, recordInfoString)
+            )
+        else:
+            await client.chat_postMessage(
+                channel = userId,
+                text =  "運動日期有誤，請再次填寫詳細資料",
+                attachments = templates.openModalAttachments(contextKey)
+            )
+    except Exception as e:
+        logger.error(e)
+        await client.chat_postMessage(
+            channel = userId,
+            text =  "上傳失敗，請再次填寫詳細資料",
+            attachments = templates.openModalAttachments(contextKey)
+        )
+
+async def fetchUploadedDate(user_id):
+    generation = logic.uploadedDatesGeneration(user_id)
+    records = [record async for record in at.iterate(AIRTABLE_NAME, **uploadedDateQuery(user_id))]
+    return logic.storeUploadedDates(user_id, records, generation)
+
+def prefetchUploadedDate(user_id):
+    if uploadedDateCache.get(user_id) is None:
+        uploadedDateFlight.task(user_id, lambda: fetchUploadedDate(user_id))
+
+async def queryUploadedDate(logger, user_id):
+    cached = logic.cachedUploadedDates(logger, user_id)
+    if cached is not None:
+        return cached
+    try:
+        return sorted(await uploadedDateFlight.do(user_id, lambda: fetchUploadedDate(user_id)))
+    except Exception as e:
+        logger.error(e)
+
+@app.middleware
+async def log_request(body, next):
+    requestLogger.logPayload(body)
+    return await next()
+
+@app.middleware
+async def record_metrics(context, next):
+    context["client"] = AsyncInstrumentedWebClient.fromClient(context.client, app.client)
+    return await next()
+
+@app.middleware
+async def dedupe_request(logger, body, req, next):
+    if deduplicator.isDuplicate(body):
+        logger.info("drop duplicate %s (retry %s)", body.get("type"), (req.headers.get("x-slack-retry-num") or [None])[0])
+        return BoltResponse(status = 200, body = "")
+    return await next()
+
+async def getFileInfo(client, file_id, logger):
+    file = fileInfoCache.get(file_id)
+    if file is None:
+        res = await client.files_info(file = file_id)
+        logger.debug(res)
+        file = slack_files.fileSubset(res["file"])
+        fileInfoCache.set(file_id, file)
+    return file
+
+@app.event("file_shared")
+@metrics.timeAsyncListener("file_shared")
+async def handle_file(event, client, logger):
+    try:
+        if slack_files.isUserUpload(event):
+            file = await getFileInfo(client, event["file_id"], logger)
+            if slack_files.isImage(file):
+                thumb_720_public = slack_files.selectThumbnail(file).replace("files.slack.com", PROXY_URL)
+                fileName = file["name"]
+                fileLink = file["url_private"].replace("files.slack.com", PROXY_URL)
+
+                blockInfo = templates.fileBlock(fileName, thumb_720_public, fileLink)
+                contextKey = contextStore.put(blockInfo)
+
+                await client.chat_postMessage(
+                    channel = event["user_id"],
+                    user = event["user_id"],
+                    text =
+                        "感謝參與EWC居家健康月！上傳作業尚未完成，請點選「填寫詳細資料」完成下一步步驟",
+                    attachments = templates.openModalAttachments(contextKey)
+                )
+            else:
+                await client.chat_postMessage(
+                    channel = event["user_id"],
+                    user = event["user_id"],
+                    text =
+                        "感謝參與EWC居家健康月！但是上傳的似乎不是一張圖片，請重新上傳正確副檔名的圖片！"
+                )
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+@app.action("open_modal_action")
+@metrics.timeAsyncListener("open_modal_action")
+async def handle_file_modal(client, body, ack, logger):
+    await ack()
+    try:
+        contextKey = body["actions"][0]["value"]
+        fileBlockInfo = contextStore.get(contextKey)
+        if fileBlockInfo is None:
+            await client.chat_postMessage(
+                channel = body["user"]["id"],
+                text = CONTEXT_EXPIRED_TEXT
+            )
+            return
+        # 選日期/送出時就不用再等 Airtable
+        prefetchUploadedDate(body["user"]["id"])
+        if MODAL_MODE == "single":
+            view = templates.singleStageView(fileBlockInfo, contextKey, DATE_HINT_BLOCK)
+        else:
+            # 顯示第一階段
+            view = templates.firstStageView(fileBlockInfo, contextKey)
+        # 更新訊息與開啟視窗互不相依，同時送出
+        async with AsyncSlackDispatch(client, "open_modal_action", body["user"]["id"]) as out:
+            out.add("views_open",
+                trigger_id = body["trigger_id"],
+                view = view
+            )
+            out.add("chat_update",
+                channel = body["container"]["channel_id"],
+                ts = body["container"]["message_ts"],
+                text = body["message"]["text"],
+                attachments = templates.MODAL_OPENED_ATTACHMENTS
+            )
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+@app.action("sport_duration_action")
+@metrics.timeAsyncListener("sport_duration_action")
+async def handle_duration_action(client, ack, body, logger):
+    await ack()
+    # 顯示第二階段
+    try:
+        if len(body["view"]["blocks"]) < 3:
+            secondBlockAlert = DATE_HINT_BLOCK
+            newBlocks = body["view"]["blocks"]
+            newBlocks.append(templates.DATE_BLOCK)
+            newBlocks.append(secondBlockAlert)
+
+            await client.views_update(
+                view_id =  body["view"]["id"],
+                hash =  body["view"]["hash"],
+                view = templates.modalView(newBlocks, body["view"]["private_metadata"])
+            )
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+@app.action("sport_date_action")
+@metrics.timeAsyncListener("sport_date_action")
+async def handle_date_action(client, ack, body, logger):
+    await ack()
+    try:
+        sport_date = body["actions"][0]["selected_date"]
+        user_id = body["user"]["id"]
+        dateList = await queryUploadedDate(logger, user_id)
+        errorInfo = logic.dateError(logger, sport_date, dateList)
+
+        blocks = body["view"]["blocks"]
+        if errorInfo is None:
+            blocks[3]["elements"][0]["text"] = ":check-carbon: 運動日期正確"
+            # 判斷首次進入
+            if len(blocks) < 5:
+                blocks.append(templates.SPORT_TYPE_BLOCK)
+                blocks.append(templates.COMMENT_BLOCK)
+            await client.views_update(
+                view_id = body["view"]["id"],
+                hash = body["view"]["hash"],
+                view = templates.modalView(blocks, body["view"]["private_metadata"], submit = True)
+            )
+        else:
+            blocks[3]["elements"][0]["text"] = ":error-carbon: " + errorInfo
+            await client.views_update(
+                view_id = body["view"]["id"],
+                hash = body["view"]["hash"],
+                view = templates.errorView(blocks, body["view"]["private_metadata"])
+            )
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+# Modal Cancel
+@app.view({
+    "callback_id": "modal_view",
+    "type": "view_closed"
+})
+@metrics.timeAsyncListener("view_closed")
+async def handle_modal_cancel(client, body, ack, logger):
+    await ack()
+    try:
+        await client.chat_postMessage(
+            channel = body["user"]["id"],
+            text =  "本次上傳已取消，如要上傳，請再次填寫詳細資料",
+            attachments = templates.openModalAttachments(logic.viewContextKey(body["view"]))
+        )
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+# After Modal Submit
+@app.view({
+    "callback_id": "modal_view",
+    "type": "view_submission"
+})
+@metrics.timeAsyncListener("view_submission")
+async def handle_file_modal_view(view, body, ack, client, logger):
+    values = view["state"]["values"]
+    if MODAL_MODE == "single":
+        # staged 模式在選日期時已檢查過，single 模式在送出時檢查
+        sport_date = values["sport_date"]["sport_date_action"]["selected_date"]
+        try:
+            # 查詢由 AsyncSingleFlight 執行，逾時不會取消查詢本身
+            dateList = await asyncio.wait_for(queryUploadedDate(logger, body["user"]["id"]), SUBMISSION_CHECK_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("uploaded date query exceeded %.1fs, ack without checking", SUBMISSION_CHECK_TIMEOUT)
+        else:
+            errorInfo = logic.dateError(logger, sport_date, dateList)
+            if errorInfo is not None:
+                deduplicator.forget(body)
+                await ack(response_action = "errors", errors = {"sport_date": errorInfo})
+                return
+    await ack()
+    try:
+        record = {
+            "ID": body["user"]["id"],
+            "Attachments": [{
+                "url": view["blocks"][0]["accessory"]["image_url"]
+            }],
+            "Duration": values["sport_duration"]["sport_duration_action"]["selected_option"]["value"],
+            "Date": values["sport_date"]["sport_date_action"]["selected_date"],
+            "Type": values["sport_type"]["sport_type_action"]["value"],
+            "Comment": values["comment"]["comment_action"]["value"],
+            "URL": view["blocks"][0]["accessory"]["alt_text"],
+            "Timestamp" : (datetime.utcnow() + timedelta(hours=UTC_OFFSET)).isoformat()
+        }
+        await insertRecord(client, record, body["user"]["id"], logic.viewContextKey(body["view"]), logger)
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+@app.action("delete_action")
+@metrics.timeAsyncListener("delete_action")
+async def handle_delete_action(client, body, ack, logger):
+    await ack()
+    try:
+        valueObj = json.loads(body["actions"][0]["value"])
+        await at.delete(AIRTABLE_NAME, valueObj["id"])
+        logic.removeUploadedDate(body["user"]["id"], valueObj["date"])
+        campaignStats.remove(body["user"]["id"], valueObj["date"])
+        # 刪除通知直接寫進原本的紀錄訊息 (AsyncSlackDispatch 會合併成一個 chat_update)
+        async with AsyncSlackDispatch(client, "delete_action", body["user"]["id"]) as out:
+            out.add("chat_postMessage",
+                channel = body["user"]["id"],
+                text =  "已成功刪除 "+ valueObj["date"] +" 日的運動記錄"
+            )
+            out.add("chat_update",
+                channel = body["container"]["channel_id"],
+                ts = body["container"]["message_ts"],
+                text = body["message"]["text"],
+                attachments = templates.RECORD_DELETED_ATTACHMENTS
+            )
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+@app.action("showFile-1")
+async def handle_actionId_0(ack, say, logger):
+    await ack()
+    try:
+        await say("https://ibm.enterprise.slack.com/files/T4D2GQDRA/F028880B3QQ")
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+@app.action("showFile-2")
+async def handle_actionId_2(ack, say, logger):
+    await ack()
+    try:
+        await say("https://ibm.enterprise.slack.com/files/T4D2GQDRA/F027X9F0F2M")
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+@app.action("showFile-3")
+async def handle_actionId_3(ack):
+    await ack()
+
+@app.action("showFile-4")
+async def handle_actionId_4(ack, say, logger):
+    await ack()
+    try:
+        await say("https://ibm.enterprise.slack.com/files/T4D2GQDRA/F02BDP60S6L")
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+@app.message("")
+@metrics.timeAsyncListener("message")
+async def handle_any_message(ack, logger, message, client):
+    await ack()
+    try:
+        await client.chat_postMessage(
+            channel = message["user"],
+            blocks = templates.HELP_BLOCKS
+        )
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+@app.command("/ewc")
+@metrics.timeAsyncListener("/ewc")
+async def handle_welcome_message(logger, command, ack, client):
+    args = command.get("text", "").split()
+    if args[:1] == ["stats"]:
+        # 直接用 ack 回覆 (只有本人看得到)
+        await ack(**logic.statsReply(command["user_id"], args[1:]))
+        return
+    await ack()
+    try:
+        await client.chat_postMessage(
+            channel =  command["user_id"],
+            text = "上傳成功囉，本次上傳紀錄如下",
+            blocks = templates.WELCOME_BLOCKS
+        )
+    except SlackApiError as e:
+        logger.error(f"Error posting message: {e}")
+
+async def nothing(request):
+    return web.Response(status = 204)
+
+async def slack_events(request):
+    start = time.perf_counter()
+    bolt_req = await to_bolt_request(request)
+    bolt_resp = await app.async_dispatch(bolt_req)
+    logic.observeRequest(bolt_req.body, time.perf_counter() - start, bolt_resp.status)
+    return await to_aiohttp_response(bolt_resp)
+
+async def metrics_endpoint(request):
+    return web.Response(body = metrics.render(), headers = {"Content-Type": metrics.CONTENT_TYPE})
+
+async def rebuildStats():
+    while True:
+        try:
+            count = await campaignStats.rebuildAsync(
+                record["fields"] async for record in backgroundAt.iterate(AIRTABLE_NAME, fields = ['ID', 'Date', 'Duration'])
+            )
+            app.logger.debug("stats rebuilt from %d records", count)
+        except Exception as e:
+            app.logger.error("stats rebuild failed: %s", e)
+        await asyncio.sleep(STATS_REBUILD_INTERVAL)
+
+async def warmAuthorization():
+    try:
+        await primeAuthorization(app, SLACK_AUTH_CACHE)
+    except Exception as e:
+        app.logger.error("auth.test failed, check SLACK_BOT_TOKEN: %s", e)
+
+async def prime_authorization(web_app):
+    # AsyncApp 不會在啟動時呼叫 auth.test，第一批同時進來的請求會各自呼叫一次
+    if STARTUP_MODE == "eager":
+        await primeAuthorization(app, SLACK_AUTH_CACHE)
+    else:
+        web_app["auth_task"] = asyncio.ensure_future(warmAuthorization())
+
+async def start_stats(web_app):
+    web_app["stats_task"] = asyncio.ensure_future(rebuildStats())
+
+async def stop_stats(web_app):
+    web_app["stats_task"].cancel()
+
+async def close_airtable(web_app):
+    await at.close()
+    await backgroundAt.close()
+
+async def open_slack_session(web_app):
+    # 沒有 session 時 AsyncWebClient 每次呼叫都會建立新的連線，改成所有請求共用一個
+    # (Bolt 每個請求的 client 會沿用 app.client.session)
+    app.client.session = aiohttp.ClientSession(timeout = aiohttp.ClientTimeout(total = app.client.timeout))
+
+async def close_slack_session(web_app):
+    await app.client.session.close()
+
+# gunicorn app_async:web_app --worker-class aiohttp.GunicornWebWorker
+web_app = web.Application()
+web_app.router.add_post("/slack/events", slack_events)
+web_app.router.add_route("*", "/", nothing)
+web_app.router.add_get("/metrics", metrics_endpoint)
+web_app.on_startup.append(open_slack_session)
+web_app.on_startup.append(prime_authorization)
+web_app.on_startup.append(start_stats)
+web_app.on_cleanup.append(stop_stats)
+web_app.on_cleanup.append(close_airtable)
+web_app.on_cleanup.append(close_slack_session)
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 3000))
+    web.run_app(web_app, host = "0.0.0.0", port = port)
@@ -1,693 +1,496 @@
 import logging
 import json
 import os
+import time
 import re
+import threading
 from datetime import datetime
 from datetime import timedelta
 
-logging.basicConfig(level=logging.WARNING)
+import config
+import context_store
 
-SLACK_BOT_TOKEN = os.environ['SLACK_BOT_TOKEN']
-SLACK_SIGNING_SECRET = os.environ['SLACK_SIGNING_SECRET']
-AIRTABLE_API_KEY = os.environ['AIRTABLE_API_KEY']
-AIRTABLE_BASE = os.environ['AIRTABLE_BASE']
-AIRTABLE_NAME = os.environ['AIRTABLE_NAME']
-PROXY_URL = os.environ['PROXY_URL']
-START_TIME = os.environ['START_TIME']
-END_TIME = os.environ['END_TIME']
-MINUS_DAY = os.environ['MINUS_DAY']
+logging.basicConfig(level=logging.WARNING)
+env = config.Env()
+logging.getLogger("ewc.requests").setLevel(env.getChoice('REQUEST_LOG_LEVEL', 'INFO', config.LOG_LEVELS))
+
+SLACK_BOT_TOKEN = env.require('SLACK_BOT_TOKEN')
+SLACK_SIGNING_SECRET = env.require('SLACK_SIGNING_SECRET')
+AIRTABLE_API_KEY = env.require('AIRTABLE_API_KEY')
+AIRTABLE_BASE = env.require('AIRTABLE_BASE')
+AIRTABLE_NAME = env.require('AIRTABLE_NAME')
+PROXY_URL = env.require('PROXY_URL')
+START_TIME, END_TIME = env.requireDateRange('START_TIME', 'END_TIME')
+MINUS_DAY = env.require('MINUS_DAY', int)
+UTC_OFFSET = env.getInt('UTC_OFFSET', 8)
+UPLOADED_DATE_CACHE_TTL = env.getInt('UPLOADED_DATE_CACHE_TTL', 600)
+UPLOADED_DATE_CACHE_SIZE = env.getInt('UPLOADED_DATE_CACHE_SIZE', 2000)
+DEDUPE_TTL = env.getInt('DEDUPE_TTL', 600)
+FILE_INFO_CACHE_TTL = env.getInt('FILE_INFO_CACHE_TTL', 300)
+CONTEXT_STORE = env.get('CONTEXT_STORE', 'inline', context_store.checkSpec)
+CONTEXT_TTL = env.getInt('CONTEXT_TTL', 7 * 24 * 3600)
+REQUEST_LOG_SAMPLE_RATE = env.getFloat('REQUEST_LOG_SAMPLE_RATE', 0.1)
+REQUEST_LOG_REDACT_URLS = env.get('REQUEST_LOG_REDACT_URLS', '1') == '1'
+LISTENER_WORKERS = env.getInt('LISTENER_WORKERS', 10)
+# ack 與非 lazy 的 listener 用的 thread 數，與 gunicorn 的 GUNICORN_THREADS 相同
+ACK_WORKERS = env.getInt('ACK_WORKERS', env.getInt('GUNICORN_THREADS', 16))
+AIRTABLE_BATCH_SIZE = env.getInt('AIRTABLE_BATCH_SIZE', 10)
+AIRTABLE_BATCH_LATENCY_MS = env.getInt('AIRTABLE_BATCH_LATENCY_MS', 200)
+WEB_CONCURRENCY = env.getInt('WEB_CONCURRENCY', 1)
+# Airtable 每個 base 5 req/s (AIRTABLE_RATE_LIMIT)，其中 AIRTABLE_BACKGROUND_RATE_LIMIT 留給背景的全表掃描
+# (/ewc stats 重建、SQLite mirror 同步)，其餘給使用者的請求；兩份額度各自由所有 gunicorn worker 平分，
+# 背景掃描只會等自己的額度，不會讓使用者的請求排隊
+AIRTABLE_TOTAL_RATE_LIMIT = env.getFloat('AIRTABLE_RATE_LIMIT', 5)
+AIRTABLE_BACKGROUND_RATE_LIMIT = env.getFloat('AIRTABLE_BACKGROUND_RATE_LIMIT', 1)
+env.expect(0 < AIRTABLE_BACKGROUND_RATE_LIMIT < AIRTABLE_TOTAL_RATE_LIMIT,
+           "AIRTABLE_BACKGROUND_RATE_LIMIT must be above 0 and below AIRTABLE_RATE_LIMIT")
+AIRTABLE_RATE_LIMIT = (AIRTABLE_TOTAL_RATE_LIMIT - AIRTABLE_BACKGROUND_RATE_LIMIT) / WEB_CONCURRENCY
+AIRTABLE_BACKGROUND_RATE_LIMIT /= WEB_CONCURRENCY
+AIRTABLE_MAX_RETRIES = env.getInt('AIRTABLE_MAX_RETRIES', 3)
+AIRTABLE_POOL_SIZE = env.getInt('AIRTABLE_POOL_SIZE', LISTENER_WORKERS)
+AIRTABLE_MIRROR_PATH = env.get('AIRTABLE_MIRROR_PATH')
+AIRTABLE_MIRROR_SYNC_INTERVAL = env.getInt('AIRTABLE_MIRROR_SYNC_INTERVAL', 60)
+# staged: 依序顯示三個階段；single: 一次顯示所有欄位，送出時檢查日期
+MODAL_MODE = env.getChoice('MODAL_MODE', 'staged', ['staged', 'single'])
+# single 模式送出時最多等幾秒查詢已上傳日期，超過就先 ack，由 lazy listener 檢查後私訊通知
+SUBMISSION_CHECK_TIMEOUT = env.getFloat('SUBMISSION_CHECK_TIMEOUT', 2)
+# 壓力測試時把 Slack / Airtable API 指向本機 stub (bench/load_test.py)
+SLACK_API_URL = env.get('SLACK_API_URL', 'https://www.slack.com/api/')
+AIRTABLE_API_URL = env.get('AIRTABLE_API_URL')
+# 可以用 /ewc stats all 查看排行榜的使用者，以逗號分隔
+ADMIN_USER_IDS = set(filter(None, env.get('ADMIN_USER_IDS', '').split(',')))
+STATS_REBUILD_INTERVAL = env.getInt('STATS_REBUILD_INTERVAL', 3600)
+# 被 Slack 回 429 或連線中斷時最多重送幾次
+SLACK_MAX_RETRIES = env.getInt('SLACK_MAX_RETRIES', 2)
+# 保持連線的 Slack 連線數，ack 與 lazy listener 的 thread 都會用到
+SLACK_POOL_SIZE = env.getInt('SLACK_POOL_SIZE', ACK_WORKERS + LISTENER_WORKERS)
+# fast: 啟動時不呼叫 auth.test，改在背景驗證 token (冷啟動時第一個請求才來得及 ack)；eager: 啟動時就驗證
+STARTUP_MODE = env.getChoice('STARTUP_MODE', 'fast', ['fast', 'eager'])
+# auth.test 結果的快取檔，重新啟動時直接沿用
+SLACK_AUTH_CACHE = env.get('SLACK_AUTH_CACHE')
+env.check()
+
+from slack_client import InstrumentedWebClient, TierLimiter, retryHandlers, prefetchAuthTest, primeAuthorization
+
+slackClient = InstrumentedWebClient(
+    token = SLACK_BOT_TOKEN,
+    base_url = SLACK_API_URL,
+    retry_handlers = retryHandlers(SLACK_MAX_RETRIES),
+    rate_limiter = TierLimiter(WEB_CONCURRENCY),
+    pool_size = SLACK_POOL_SIZE
+)
+# fast 模式的 auth.test 在背景執行，與下面 slack_bolt / flask 的 import 同時進行
+authTest = prefetchAuthTest(slackClient) if STARTUP_MODE == "fast" else None
 
 from slack_bolt.app import App
+from slack_bolt import BoltResponse
 from slack_sdk.errors import SlackApiError
 from slack_bolt.adapter.flask import SlackRequestHandler
+from slack_bolt.adapter.flask.handler import to_bolt_request, to_flask_response
+from slack_bolt.lazy_listener.thread_runner import ThreadLazyListenerRunner
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from slack_dispatch import SlackDispatch
+import metrics
 
 app = App(
-    token = SLACK_BOT_TOKEN,
-    signing_secret = SLACK_SIGNING_SECRET
+    client = slackClient,
+    signing_secret = SLACK_SIGNING_SECRET,
+    token_verification_enabled = authTest is None,
+    listener_executor = ThreadPoolExecutor(max_workers = ACK_WORKERS, thread_name_prefix = "ack")
+)
+# Bolt 預設 ack 與 lazy listener 共用 listener_executor，lazy 工作 (Airtable、Slack 呼叫)
+# 塞滿 pool 時 ack 會排隊超過 3 秒；lazy listener 改用自己的 pool，並限制同時處理的數量
+app.listener_runner.lazy_listener_runner = ThreadLazyListenerRunner(
+    logger = app.logger,
+    executor = ThreadPoolExecutor(max_workers = LISTENER_WORKERS, thread_name_prefix = "lazy")
+)
+
+if authTest is not None:
+    primeAuthorization(app, authTest, SLACK_AUTH_CACHE)
+
+from airtable_client import AirtableClient, isValidationError
+from batch_writer import BatchWriter
+
+at = AirtableClient(
+    AIRTABLE_BASE,
+    AIRTABLE_API_KEY,
+    rate = AIRTABLE_RATE_LIMIT,
+    max_retries = AIRTABLE_MAX_RETRIES,
+    pool_size = AIRTABLE_POOL_SIZE,
+    api_url = AIRTABLE_API_URL
+)
+# 背景全表掃描用的 client，有自己的 token bucket
+backgroundAt = AirtableClient(
+    AIRTABLE_BASE,
+    AIRTABLE_API_KEY,
+    rate = AIRTABLE_BACKGROUND_RATE_LIMIT,
+    max_retries = AIRTABLE_MAX_RETRIES,
+    pool_size = 1,
+    api_url = AIRTABLE_API_URL
 )
 
-import airtable
+# 短時間內的多筆上傳合併成一次 bulk create
+recordWriter = BatchWriter(
+    lambda records: at.batch_create(AIRTABLE_NAME, records),
+    max_batch = min(AIRTABLE_BATCH_SIZE, AirtableClient.MAX_BATCH_SIZE),
+    max_latency = AIRTABLE_BATCH_LATENCY_MS / 1000,
+    split_on = isValidationError
+)
+
+from ttl_cache import TTLCache
+import templates
+from request_log import RequestLogger
+import slack_files
+from idempotency import Deduplicator
+from campaign import Campaign
+from bot_logic import BotLogic, isNotRepeat, uploadedDateQuery
+from stats import CampaignStats
+from single_flight import SingleFlight
+
+CAMPAIGN = Campaign.fromConfig(START_TIME, END_TIME, MINUS_DAY, UTC_OFFSET)
+DATE_HINT_BLOCK = templates.dateHintBlock(CAMPAIGN.hint_text)
 
-at = airtable.Airtable(AIRTABLE_BASE, AIRTABLE_API_KEY)
+# /ewc stats 用的統計，啟動時掃描一次整個 table，之後隨新增/刪除更新
+campaignStats = CampaignStats()
 
-def insertRecord(record, userId, blockInfo, logger):
+# 每位使用者已上傳日期的快取，新增/刪除紀錄時直接更新
+uploadedDateCache = TTLCache(maxsize = UPLOADED_DATE_CACHE_SIZE, ttl = UPLOADED_DATE_CACHE_TTL)
+
+# 開啟視窗時先在背景查詢已上傳日期，同一位使用者同時只會有一個查詢
+uploadedDateFlight = SingleFlight("uploaded_dates")
+prefetchExecutor = ThreadPoolExecutor(max_workers = 4, thread_name_prefix = "prefetch")
+
+# Slack 重送 (X-Slack-Retry-Num) 或重複送出同一個 view 時直接 ack
+deduplicator = Deduplicator(ttl = DEDUPE_TTL)
+
+# 按鈕 value / private_metadata 只帶 key，檔案資訊留在 server
+contextStore = context_store.fromConfig(CONTEXT_STORE, CONTEXT_TTL)
+CONTEXT_EXPIRED_TEXT = "上傳資料已過期，請重新上傳一次圖片"
+
+requestLogger = RequestLogger(sample_rate = REQUEST_LOG_SAMPLE_RATE, redact = REQUEST_LOG_REDACT_URLS)
+
+# 日期檢查、已上傳日期快取與 /ewc stats 的邏輯與 app_async 共用
+logic = BotLogic(CAMPAIGN, contextStore, uploadedDateCache, campaignStats, requestLogger, ADMIN_USER_IDS)
+
+# files_info 只保留用得到的欄位
+fileInfoCache = TTLCache(maxsize = 500, ttl = FILE_INFO_CACHE_TTL)
+
+# 有設定 AIRTABLE_MIRROR_PATH 時，重複日期檢查改查本機 SQLite
+mirror = None
+if AIRTABLE_MIRROR_PATH:
+    from mirror import AirtableMirror
+    mirror = AirtableMirror(AIRTABLE_MIRROR_PATH, backgroundAt, AIRTABLE_NAME, sync_interval = AIRTABLE_MIRROR_SYNC_INTERVAL)
+    mirror.start()
+
+def rebuildStats():
+    while True:
+        try:
+            count = campaignStats.rebuild(
+                record["fields"] for record in backgroundAt.iterate(AIRTABLE_NAME, fields = ['ID', 'Date', 'Duration'])
+            )
+            app.logger.debug("stats rebuilt from %d records", count)
+        except Exception as e:
+            app.logger.error("stats rebuild failed: %s", e)
+        time.sleep(STATS_REBUILD_INTERVAL)
+
+threading.Thread(target = rebuildStats, name = "stats-rebuild", daemon = True).start()
+
+def insertRecord(client, record, userId, contextKey, logger):
+    reservation = None
     try:
         dateList = queryUploadedDate(logger, userId)
-        if isNotRepeat(logger, record["Date"], dateList) and isNotOver(logger, record["Date"]):
+        isValid = isNotRepeat(logger, record["Date"], dateList) and logic.isNotOver(logger, record["Date"])
+        if isValid and mirror is not None:
+            # 同一天連續送出兩次時，只有一筆能取得 (ID, Date)
+            reservation = mirror.reserve(userId, record["Date"])
+            isValid = reservation is not None
+        if isValid:
             logger.debug(record)
-            res = at.create(AIRTABLE_NAME, record)
+            res = recordWriter.submit(record).result()
+            if reservation is not None:
+                mirror.commit(reservation, res["id"], record)
+                reservation = None
+            logic.addUploadedDate(userId, record["Date"])
+            campaignStats.add(userId, record["Date"], record["Duration"])
             recordInfo = {
                 "id":res["id"],
                 "date": record["Date"]
             }
             recordInfoString = json.dumps(recordInfo)
 
-            # Handle Optional Column
-            if record["Comment"] is None:
-                comment = ""
-            else:
-                comment = record["Comment"]
-
-            app.client.chat_postMessage(
-                token =  SLACK_BOT_TOKEN,
+            client.chat_postMessage(
                 channel =  userId,
                 text = "上傳成功囉，本次上傳紀錄如下",
-                attachments = [{
-                    "color": "#f2c744",
-                    "blocks": [{
-                        "type": "section",
-                        "text": {
-                            "type": "mrkdwn",
-                            "text": "*運動時間：* " +
-                                record["Duration"] +
-                                "\n\n*運動日期：* " +
-                                record["Date"] +
-                                "\n\n*運動項目：* " +
-                                record["Type"] +
-                                "\n\n*備註：* " +
-                                comment
-                        },
-                        "accessory": {
-                            "type": "image",
-                            "image_url": record["Attachments"][0]["url"],
-                            "alt_text": "Thumbnail"
-                        }
-                    },
-                    {
-                        "type": "actions",
-                        "elements": [{
-                            "type": "button",
-                            "text": {
-                                "type": "plain_text",
-                                "text": "刪除這筆紀錄",
-                                "emoji": True
-                            },
-                            "style": "danger",
-                            "value": recordInfoString,
-                            "action_id": "delete_action",
-                            "confirm": {
-                                "title": {
-                                    "type": "plain_text",
-                                    "text": "真的要刪除嗎"
-                                },
-                                "text": {
-                                    "type": "mrkdwn",
-                                    "text": "刪除 " + record["Date"] +"日 的運動紀錄"
-                                },
-                                "confirm": {
-                                    "type": "plain_text",
-                                    "text": "Delete"
-                                },
-                                "deny": {
-                                    "type": "plain_text",
-                                    "text": "Cancel"
-                                }
-                            },
-                        }]
-                    }]
-                }]
+                attachments = templates.recordAttachments(record, recordInfoString)
             )
         else:
-            blockInfoString = json.dumps(blockInfo)
-            app.client.chat_postMessage(
-                token =  SLACK_BOT_TOKEN,
+            client.chat_postMessage(
                 channel = userId,
                 text =  "運動日期有誤，請再次填寫詳細資料",
-                attachments = [{
-                    "color": "#f2c744",
-                    "blocks": [{
-                        "type": "actions",
-                        "elements": [{
-                            "type": "button",
-                            "text": {
-                                "type": "plain_text",
-                                "text": "填寫詳細資料",
-                                "emoji": True
-                            },
-                            "style": "primary",
-                            "value": blockInfoString,
-                            "action_id": "open_modal_action"
-                        }]
-                    }]
-                }]
+                attachments = templates.openModalAttachments(contextKey)
             )
     except Exception as e:
         logger.error(e)
-        blockInfoString = json.dumps(blockInfo)
-        app.client.chat_postMessage(
-            token =  SLACK_BOT_TOKEN,
+        if reservation is not None:
+            mirror.release(reservation)
+        client.chat_postMessage(
             channel = userId,
             text =  "上傳失敗，請再次填寫詳細資料",
-            attachments = [{
-                "color": "#f2c744",
-                "blocks": [{
-                    "type": "actions",
-                    "elements": [{
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "填寫詳細資料",
-                            "emoji": True
-                        },
-                        "style": "primary",
-                        "value": blockInfoString,
-                        "action_id": "open_modal_action"
-                    }]
-                }]
-            }]
+            attachments = templates.openModalAttachments(contextKey)
         )
 
-def isNotRepeat(logger, sport_date, dateList):
-    try:
-        if sport_date not in dateList:
-            logger.debug("isNotRepeat!")
-            return True
-        else:
-            logger.debug("isRepeat!")
-            return False
-    except Exception as e:
-        logger.error(e)
-
-def isNotOver(logger, sport_date):
-    logger.debug(sport_date)
-    try:
-        startDate = datetime.strptime(START_TIME, "%Y-%m-%d")
-        endDate = datetime.strptime(END_TIME, "%Y-%m-%d")
-        sportDateValue = datetime.strptime(sport_date, "%Y-%m-%d")
-        today = (datetime.utcnow() + timedelta(hours=8)).date()
-        today_n = (datetime.utcnow() - timedelta(days=int(MINUS_DAY))).date()
-        logger.debug("today is " + str(today))
-        logger.debug("today - n is " + str(today_n))
-        if (sportDateValue >= startDate and sportDateValue <= endDate) and (sportDateValue.date() >= today_n and sportDateValue.date() <= today):
-            logger.debug("isNotOver!")
-            return True
-        else:
-            logger.debug("isOver!")
-            return False
-    except Exception as e:
-        logger.error(e)
-
-def queryUploadedDate(logger, user_id):
+def fetchUploadedDate(user_id):
+    generation = logic.uploadedDatesGeneration(user_id)
+    return logic.storeUploadedDates(user_id, at.iterate(AIRTABLE_NAME, **uploadedDateQuery(user_id)), generation)
+
+def uploadedDateFuture(user_id, executor = None):
+    return uploadedDateFlight.submit(user_id, lambda: fetchUploadedDate(user_id), executor)
+
+def prefetchUploadedDate(user_id):
+    if mirror is not None and mirror.ready:
+        return
+    if uploadedDateCache.get(user_id) is None:
+        uploadedDateFuture(user_id, prefetchExecutor)
+
+def queryUploadedDate(logger, user_id, timeout = None):
+    # 有 timeout 時在 prefetchExecutor 查詢，超過 timeout 丟出 FutureTimeoutError，查詢仍在背景繼續
+    if mirror is not None and mirror.ready:
+        return sorted(mirror.uploadedDates(user_id))
+    cached = logic.cachedUploadedDates(logger, user_id)
+    if cached is not None:
+        return cached
     try:
-        filterByFormula = "{ID} = '" + user_id + "'"
-        logger.debug(filterByFormula)
-        res = at.get(table_name = "Table 1", fields = ['ID', 'Date'], filter_by_formula=filterByFormula)
-        logger.debug(res)
-        dateSet = set()
-        for record in res["records"]:
-            if "Date" in record["fields"]:
-                dateSet.add(record["fields"]["Date"])
-        return sorted(dateSet)
+        executor = prefetchExecutor if timeout is not None else None
+        return sorted(uploadedDateFuture(user_id, executor).result(timeout = timeout))
+    except FutureTimeoutError:
+        raise
     except Exception as e:
         logger.error(e)
 
 @app.middleware  # or app.use(log_request)
-def log_request(logger, body, next):
-    logger.debug(body)
+def log_request(body, next):
+    requestLogger.logPayload(body)
     return next()
 
-@app.event("file_shared")
-def handle_file(event, client, logger):
-    logger.debug("看這裡")
-    logger.debug(event)
-    try:
-        if event["channel_id"][0] == "D":
-            res = client.files_info (
-                token = SLACK_BOT_TOKEN,
-                file = event["file_id"]
-            )
-
-            logger.debug(res)
-            if res["file"]["mimetype"].split("/")[0] == "image":
+@app.middleware
+def record_metrics(context, next):
+    # ack 的 thread 不排隊等 Slack 的 rate limit，lazy listener 拿到的複本才排隊
+    context["client"] = InstrumentedWebClient.fromClient(context.client, app.client, queue_calls = False)
+    return next()
 
+@app.middleware
+def dedupe_request(logger, body, req, next):
+    if deduplicator.isDuplicate(body):
+        logger.info("drop duplicate %s (retry %s)", body.get("type"), (req.headers.get("x-slack-retry-num") or [None])[0])
+        return BoltResponse(status = 200, body = "")
+    return next()
 
-                if res["file"]["original_w"] >= 720:
-                    thumb_720_public = res["file"]["thumb_720"].replace("files.slack.com", PROXY_URL)
-                elif res["file"]["original_w"] >= 480:
-                    thumb_720_public = res["file"]["thumb_480"].replace("files.slack.com", PROXY_URL)
-                elif res["file"]["original_w"] >= 360:
-                    thumb_720_public = res["file"]["thumb_360"].replace("files.slack.com", PROXY_URL)
-                else:
-                    thumb_720_public = res["file"]["url_private"].replace("files.slack.com", PROXY_URL)
+class SharedFuture(Future):
+    # lazy listener 拿到的是 deepcopy 的 context，複本要與 ack 共用同一個 Future
+    def __deepcopy__(self, memo):
+        return self
 
-                # thumb_720_public = res["file"]["thumb_720"].replace("files.slack.com", PROXY_URL)
-                fileName = res["file"]["name"]
-                fileLink = res["file"]["url_private"].replace("files.slack.com", PROXY_URL)
+@app.middleware
+def submission_decision(body, context, next):
+    # ack 與 lazy listener 同時開始執行，lazy listener 透過這個 Future 等 ack 是否已在視窗上顯示錯誤
+    if body.get("type") == "view_submission":
+        context["submission_rejected"] = SharedFuture()
+    return next()
 
-                fileInfo = {
-                    "thumb_720_public": thumb_720_public,
-                    "fileLink": fileLink,
-                    "fileName": fileName
-                }
+def ack_only(ack):
+    ack()
 
-                blockInfo = {
-                    "type": "section",
-                    "block_id": "sport_image",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": "*檔案名稱*\n" + fileInfo["fileName"]
-                    },
-                    "accessory": {
-                        "type": "image",
-                        "image_url": fileInfo["thumb_720_public"],
-                        "alt_text": fileInfo["fileLink"]
-                    }
-                }
+def getFileInfo(client, file_id, logger):
+    file = fileInfoCache.get(file_id)
+    if file is None:
+        res = client.files_info(
+            file = file_id
+        )
+        logger.debug(res)
+        file = slack_files.fileSubset(res["file"])
+        fileInfoCache.set(file_id, file)
+    return file
 
+@metrics.timeListener("file_shared")
+def handle_file(event, client, logger):
+    try:
+        if slack_files.isUserUpload(event):
+            file = getFileInfo(client, event["file_id"], logger)
+            if slack_files.isImage(file):
+                thumb_720_public = slack_files.selectThumbnail(file).replace("files.slack.com", PROXY_URL)
+                fileName = file["name"]
+                fileLink = file["url_private"].replace("files.slack.com", PROXY_URL)
 
-                blockInfoString = json.dumps(blockInfo)
+                blockInfo = templates.fileBlock(fileName, thumb_720_public, fileLink)
+                contextKey = contextStore.put(blockInfo)
 
-                logger.debug(fileInfo)
+                logger.debug(blockInfo)
 
                 client.chat_postMessage(
                     channel = event["user_id"],
                     user = event["user_id"],
                     text =
                         "感謝參與EWC居家健康月！上傳作業尚未完成，請點選「填寫詳細資料」完成下一步步驟",
-                    attachments = [{
-                        "color": "#f2c744",
-                        "blocks": [{
-                            "type": "actions",
-                            "elements": [{
-                                "type": "button",
-                                "text": {
-                                    "type": "plain_text",
-                                    "text": "填寫詳細資料",
-                                    "emoji": True
-                                },
-                                "style": "primary",
-                                "value": blockInfoString,
-                                "action_id": "open_modal_action"
-                            }]
-                        }]
-                    }]
+                    attachments = templates.openModalAttachments(contextKey)
                 )
             else:
-                if event["file_id"] != "F028880B3QQ" and event["file_id"] != "F027X9F0F2M" and event["file_id"] != "F02BDP60S6L":
-                    client.chat_postMessage(
-                        channel = event["user_id"],
-                        user = event["user_id"],
-                        text =
-                            "感謝參與EWC居家健康月！但是上傳的似乎不是一張圖片，請重新上傳正確副檔名的圖片！"
-                    )
+                client.chat_postMessage(
+                    channel = event["user_id"],
+                    user = event["user_id"],
+                    text =
+                        "感謝參與EWC居家健康月！但是上傳的似乎不是一張圖片，請重新上傳正確副檔名的圖片！"
+                )
     except SlackApiError as e:
         logger.error(f"Error posting message: {e}")
 
+app.event("file_shared")(ack = ack_only, lazy = [handle_file])
+
 @app.action("open_modal_action")
+@metrics.timeListener("open_modal_action")
 def handle_file_modal(client, body, ack, logger):
     ack()
-    logger.debug(body)
     try:
-        client.chat_update(
-            token = SLACK_BOT_TOKEN,
-            channel = body["container"]["channel_id"],
-            ts = body["container"]["message_ts"],
-            text = body["message"]["text"],
-            attachments =  [{
-                "blocks": [{
-                    "type": "context",
-                    "elements": [{
-                        "type": "plain_text",
-                        "text": "編輯視窗已開啟",
-                        "emoji": True
-                    }]
-                }]
-            }]
-        )
+        contextKey = body["actions"][0]["value"]
+        fileBlockInfo = contextStore.get(contextKey)
+        if fileBlockInfo is None:
+            client.chat_postMessage(
+                channel = body["user"]["id"],
+                text = CONTEXT_EXPIRED_TEXT
+            )
+            return
+        # 選日期/送出時就不用再等 Airtable
+        prefetchUploadedDate(body["user"]["id"])
 
-        valueObj = json.loads(body["actions"][0]["value"])
-        # 顯示第一階段
-        client.views_open(
-            trigger_id = body["trigger_id"],
-            view = {
-                "type": "modal",
-                "callback_id": "modal_view",
-                "notify_on_close": True,
-                "title": {
-                    "type": "plain_text",
-                    "text": "填寫運動紀錄",
-                    "emoji": True
-                },
-                # "submit": {
-                #     "type": "plain_text",
-                #     "text": "Submit",
-                #     "emoji": True
-                # },
-                # "close": {
-                #     "type": "plain_text",
-                #     "text": "Cancel",
-                #     "emoji": True
-                # },
-                "blocks": [
-                valueObj,
-                {
-                    "type": "section",
-                    "block_id": "sport_duration",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": "*運動時間*"
-                    },
-                    "accessory": {
-                        "type": "static_select",
-                        "placeholder": {
-                            "type": "plain_text",
-                            "text": "選擇運動時間",
-                            "emoji": True
-                        },
-                        "options": [{
-                            "text": {
-                                "type": "plain_text",
-                                "text": "30分鐘",
-                                "emoji": True
-                            },
-                            "value": "30分鐘"
-                        },
-                        {
-                            "text": {
-                                "type": "plain_text",
-                                "text": "30~40分鐘",
-                                "emoji": True
-                            },
-                            "value": "30~40分鐘"
-                        },
-                        {
-                            "text": {
-                                "type": "plain_text",
-                                "text": "40~50分鐘",
-                                "emoji": True
-                            },
-                            "value": "40~50分鐘"
-                        },
-                        {
-                            "text": {
-                                "type": "plain_text",
-                                "text": "50~60分鐘",
-                                "emoji": True
-                            },
-                            "value": "50~60分鐘"
-                        },
-                        {
-                            "text": {
-                                "type": "plain_text",
-                                "text": "超過1小時",
-                                "emoji": True
-                            },
-                            "value": "超過1小時"
-                        }],
-                        "action_id": "sport_duration_action"
-                    }
-                },
-                # {
-                #     "type": "section",
-                #     "block_id": "sport_date",
-                #     "text": {
-                #         "type": "mrkdwn",
-                #         "text": "*運動日期*"
-                #     },
-                #     "accessory": {
-                #         "type": "datepicker",
-                #         "initial_date": "2021-07-01",
-                #         "placeholder": {
-                #             "type": "plain_text",
-                #             "text": "Select a date",
-                #             "emoji": True
-                #         },
-                #         "action_id": "sport_date_action"
-                #     }
-                # },
-                # {
-                #     "type": "input",
-                #     "block_id": "sport_type",
-                #     "element": {
-                #         "type": "plain_text_input",
-                #         "action_id": "sport_type_action"
-                #     },
-                #     "label": {
-                #         "type": "plain_text",
-                #         "text": "運動項目",
-                #         "emoji": True
-                #     }
-                # },
-                # {
-                #     "type": "input",
-                #     "block_id": "comment",
-                #     "element": {
-                #         "type": "plain_text_input",
-                #         "action_id": "comment_action"
-                #     },
-                #     "optional": True,
-                #     "label": {
-                #         "type": "plain_text",
-                #         "text": "備註",
-                #         "emoji": True
-                #     }
-                # }
-                ]
-            }
-        )
+        if MODAL_MODE == "single":
+            view = templates.singleStageView(fileBlockInfo, contextKey, DATE_HINT_BLOCK)
+        else:
+            # 顯示第一階段
+            view = templates.firstStageView(fileBlockInfo, contextKey)
+        # 開啟視窗與更新訊息互不相依，同時送出；trigger_id 會過期，views_open 放第一個
+        with SlackDispatch(client, "open_modal_action", body["user"]["id"]) as out:
+            out.add("views_open",
+                trigger_id = body["trigger_id"],
+                view = view
+            )
+            out.add("chat_update",
+                channel = body["container"]["channel_id"],
+                ts = body["container"]["message_ts"],
+                text = body["message"]["text"],
+                attachments = templates.MODAL_OPENED_ATTACHMENTS
+            )
     except SlackApiError as e:
         logger.error(f"Error posting message: {e}")
 
-@app.action("sport_duration_action")
-def handle_some_action(client, ack, body, logger):
-    ack()
-    logger.debug(body)
+@metrics.timeListener("sport_duration_action")
+def handle_sport_duration_action(client, body, logger):
     # 顯示第二階段
     try:
         if len(body["view"]["blocks"]) < 3:
-            secondBlock = {
-                "type": "section",
-                "block_id": "sport_date",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": "*運動日期*"
-                },
-                "accessory": {
-                    "type": "datepicker",
-                    "placeholder": {
-                        "type": "plain_text",
-                        "text": "Select a date",
-                        "emoji": True
-                    },
-                    "action_id": "sport_date_action",
-                }
-            }
-            startTimeText=str(int(START_TIME.split('-')[1])) + '/' + str(int(START_TIME.split('-')[2]))
-            endTimeText=str(int(END_TIME.split('-')[1])) + '/' + str(int(END_TIME.split('-')[2]))
-
-            secondBlockAlert={
-                "type": "context",
-                "elements": [{
-                    "type": "plain_text",
-                    "text": "請填寫" + startTimeText +"～" + endTimeText + "之間的日期，不能重複上傳相同日期，並且只能上傳當日～前" + MINUS_DAY + "天的日期",
-                    "emoji": True
-                }]
-            }
+            secondBlockAlert = DATE_HINT_BLOCK
             newBlocks = body["view"]["blocks"]
-            newBlocks.append(secondBlock)
+            newBlocks.append(templates.DATE_BLOCK)
             newBlocks.append(secondBlockAlert)
 
             client.views_update(
                 view_id =  body["view"]["id"],
                 hash =  body["view"]["hash"],
-                view = {
-                    "type": body["view"]["type"],
-                    "callback_id": body["view"]["callback_id"],
-                    "notify_on_close": True,
-                    "title": body["view"]["title"],
-                    "blocks": newBlocks,
-                }
+                view = templates.modalView(newBlocks, body["view"]["private_metadata"])
             )
     except SlackApiError as e:
         logger.error(f"Error posting message: {e}")
 
-@app.action("sport_date_action")
-def handle_some_action(client, ack, body, logger):
-    ack()
-    logger.debug(body)
+# 查詢 Airtable 與 views_update 都在 lazy listener，ack 的 thread 只負責 ack
+app.action("sport_duration_action")(ack = ack_only, lazy = [handle_sport_duration_action])
+
+@metrics.timeListener("sport_date_action")
+def handle_sport_date_action(client, body, logger):
     try:
         sport_date = body["actions"][0]["selected_date"]
         user_id = body["user"]["id"]
         dateList = queryUploadedDate(logger, user_id)
         logger.debug(dateList)
-        isNotOverResult=isNotOver(logger, sport_date)
-        isNotRepeatResult=isNotRepeat(logger, sport_date, dateList)
-
-        errorInfo=""
-
-        if isNotRepeatResult==False:
-            errorInfo="運動日期有誤（不能上傳重複日期）"
-
-        if isNotOverResult==False:
-            # errorInfo="不能上傳當日及前" + MINUS_DAY + "天以外的日期/上傳日期超出活動期間"
-            errorInfo="運動日期有誤（僅能上傳當日～" + MINUS_DAY + "日前之資料，並且需指定活動期間內之日期）"
+        errorInfo = logic.dateError(logger, sport_date, dateList)
         logger.debug(errorInfo)
 
-        # 判斷首次進入
-        if len(body["view"]["blocks"]) < 5:
-            if isNotOverResult and isNotRepeatResult:
+        blocks = body["view"]["blocks"]
+        if errorInfo is None:
+            blocks[3]["elements"][0]["text"] = ":check-carbon: 運動日期正確"
+            # 判斷首次進入
+            if len(blocks) < 5:
                 logger.debug("首次進入，並且符合條件，顯示第三階段")
-                logger.debug(body["view"]["blocks"][3]["elements"][0]["text"])
-                body["view"]["blocks"][3]["elements"][0]["text"] = ":check-carbon: 運動日期正確"
-
-                thirdBlock = {
-                    "type": "input",
-                    "block_id": "sport_type",
-                    "element": {
-                        "type": "plain_text_input",
-                        "action_id": "sport_type_action"
-                    },
-                    "label": {
-                        "type": "plain_text",
-                        "text": "運動項目",
-                        "emoji": True
-                    }
-                }
-                forthBlock = {
-                    "type": "input",
-                    "block_id": "comment",
-                    "element": {
-                        "type": "plain_text_input",
-                        "action_id": "comment_action"
-                    },
-                    "optional": True,
-                    "label": {
-                        "type": "plain_text",
-                        "text": "備註",
-                        "emoji": True
-                    }
-                }
-                newBlocks = body["view"]["blocks"]
-                newBlocks.append(thirdBlock)
-                newBlocks.append(forthBlock)
-
-                client.views_update(
-                    view_id = body["view"]["id"],
-                    hash = body["view"]["hash"],
-                    view = {
-                        "type": body["view"]["type"],
-                        "callback_id": body["view"]["callback_id"],
-                        "notify_on_close": True,
-                        "title": body["view"]["title"],
-                        "blocks": newBlocks,
-                        "submit": {
-                            "type": "plain_text",
-                            "text": "Submit",
-                            "emoji": True
-                        },
-                        "close": {
-                            "type": "plain_text",
-                            "text": "Cancel",
-                            "emoji": True
-                        },
-                        # submit_disabled: true,
-                    }
-                )
+                blocks.append(templates.SPORT_TYPE_BLOCK)
+                blocks.append(templates.COMMENT_BLOCK)
             else:
-                logger.debug("首次進入，但不符合條件，顯示錯誤訊息")
-                # body["view"]["blocks"][3]["elements"][0]["text"] = ":error-carbon: 此日期已有上傳紀錄/日期超出比賽範圍\n目前已有上傳的日期有：" + '、'.join(dateList)
-                body["view"]["blocks"][3]["elements"][0]["text"] = ":error-carbon: " + errorInfo
-                logger.debug(body)
-
-                client.views_update(
-                    view_id = body["view"]["id"],
-                    hash = body["view"]["hash"],
-                    view = {
-                        "type": "workflow_step",
-                        "callback_id": body["view"]["callback_id"],
-                        # "notify_on_close": True,
-                        "blocks": body["view"]["blocks"],
-                        "submit_disabled": True
-                    }
-                )
-        else:
-            if isNotOverResult and isNotRepeatResult:
                 logger.debug("非首次進入，符合條件，顯示OK訊息")
-                body["view"]["blocks"][3]["elements"][0]["text"] = ":check-carbon: 運動日期正確"
-                client.views_update(
-                    view_id = body["view"]["id"],
-                    hash = body["view"]["hash"],
-                    view = {
-                        "type": "modal",
-                        "callback_id": body["view"]["callback_id"],
-                        "notify_on_close": True,
-                        "title": {
-                            "type": "plain_text",
-                            "text": "填寫運動紀錄",
-                            "emoji": True
-                        },
-                        "blocks": body["view"]["blocks"],
-                        "submit": {
-                            "type": "plain_text",
-                            "text": "Submit",
-                            "emoji": True
-                        },
-                        "close": {
-                            "type": "plain_text",
-                            "text": "Cancel",
-                            "emoji": True
-                        },
-                    }
-                )
-            else:
-                logger.debug("非首次進入，不符合條件，顯示NG訊息")
-                # body["view"]["blocks"][3]["elements"][0]["text"] = ":error-carbon: 此日期已有上傳紀錄/日期超出比賽範圍\n目前已有上傳的日期有：" + '、'.join(dateList)
-                body["view"]["blocks"][3]["elements"][0]["text"] = ":error-carbon: " + errorInfo
-                client.views_update(
-                    view_id = body["view"]["id"],
-                    hash = body["view"]["hash"],
-                    view = {
-                        "type": "workflow_step",
-                        "callback_id": body["view"]["callback_id"],
-                        # "notify_on_close": True,
-                        "blocks": body["view"]["blocks"],
-                        "submit_disabled": True
-                    }
-                )
+            client.views_update(
+                view_id = body["view"]["id"],
+                hash = body["view"]["hash"],
+                view = templates.modalView(blocks, body["view"]["private_metadata"], submit = True)
+            )
+        else:
+            logger.debug("不符合條件，顯示錯誤訊息")
+            blocks[3]["elements"][0]["text"] = ":error-carbon: " + errorInfo
+            client.views_update(
+                view_id = body["view"]["id"],
+                hash = body["view"]["hash"],
+                view = templates.errorView(blocks, body["view"]["private_metadata"])
+            )
     except SlackApiError as e:
         logger.error(f"Error posting message: {e}")
 
+app.action("sport_date_action")(ack = ack_only, lazy = [handle_sport_date_action])
+
 # Modal Cancel
-@app.view({
-    "callback_id": "modal_view",
-    "type": "view_closed"
-})
-def handle_modal_cancel(client, body, ack, logger):
-    ack()
-    blockInfoString = json.dumps(body["view"]["blocks"][0])
+@metrics.timeListener("view_closed")
+def handle_modal_cancel(client, body, logger):
+    contextKey = logic.viewContextKey(body["view"])
     try:
         client.chat_postMessage(
             channel = body["user"]["id"],
             text =  "本次上傳已取消，如要上傳，請再次填寫詳細資料",
-            attachments = [{
-                "color": "#f2c744",
-                "blocks": [{
-                    "type": "actions",
-                    "elements": [{
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "填寫詳細資料",
-                            "emoji": True
-                        },
-                        "style": "primary",
-                        "value": blockInfoString,
-                        "action_id": "open_modal_action"
-                    }]
-                }]
-            }]
+            attachments = templates.openModalAttachments(contextKey)
         )
     except SlackApiError as e:
         logger.error(f"Error posting message: {e}")
 
-# After Modal Submit
-@app.view({
+app.view({
     "callback_id": "modal_view",
-    "type": "view_submission"
-})
-def handle_file_modal_view(view, body, ack, logger):
-    ack()
-    logger.debug(body)
+    "type": "view_closed"
+})(ack = ack_only, lazy = [handle_modal_cancel])
+
+# After Modal Submit
+def submissionErrors(logger, view, user_id):
+    # 只有 single 模式需要在送出時檢查，staged 模式在選日期時已檢查過
+    if MODAL_MODE != "single":
+        return None
+    sport_date = view["state"]["values"]["sport_date"]["sport_date_action"]["selected_date"]
+    errorInfo = logic.dateError(logger, sport_date, queryUploadedDate(logger, user_id, timeout = SUBMISSION_CHECK_TIMEOUT))
+    if errorInfo is None:
+        return None
+    return {"sport_date": errorInfo}
+
+def ack_submission(ack, view, body, context, logger):
+    try:
+        errors = submissionErrors(logger, view, body["user"]["id"])
+    except FutureTimeoutError:
+        # 來不及在 3 秒內回覆，先關閉視窗，日期有誤時 insertRecord 會私訊通知
+        logger.warning("uploaded date query exceeded %.1fs, ack without checking", SUBMISSION_CHECK_TIMEOUT)
+        errors = None
+    context["submission_rejected"].set_result(bool(errors))
+    if errors:
+        deduplicator.forget(body)
+        ack(response_action = "errors", errors = errors)
+    else:
+        ack()
+
+@metrics.timeListener("view_submission")
+def handle_file_modal_view(view, body, client, context, logger):
+    # 被 ack 擋下的送出不做任何事；Slack 只等 ack 3 秒，沒有回覆或沒有檢查時 insertRecord 仍會檢查日期
+    try:
+        if context["submission_rejected"].result(timeout = 3):
+            return
+    except FutureTimeoutError:
+        pass
     try:
         sport_thumbnail = view["blocks"][0]["accessory"]["image_url"]
         sport_image_link = view["blocks"][0]["accessory"]["alt_text"]
@@ -706,7 +509,7 @@ def handle_file_modal_view(view, body, ack, logger):
         # userEmail = res["user"]["profile"]["email"]
 
         # timestampStr = (datetime.utcnow() + timedelta(hours=8)).strftime("%Y-%m-%d  %H:%M:%S")
-        timestamp = (datetime.utcnow() + timedelta(hours=8))
+        timestamp = (datetime.utcnow() + timedelta(hours=UTC_OFFSET))
         # timestampVal = datetime.timestamp(timestampStr)
         timestampVal = timestamp.isoformat();
         logger.debug(timestampVal)
@@ -724,40 +527,41 @@ def handle_file_modal_view(view, body, ack, logger):
             "URL": sport_image_link,
             "Timestamp" : timestampVal
         }
-        insertRecord(record, body["user"]["id"], body["view"]["blocks"][0], logger)
+        insertRecord(client, record, body["user"]["id"], logic.viewContextKey(body["view"]), logger)
     except SlackApiError as e:
         logger.error(f"Error posting message: {e}")
 
-@app.action("delete_action")
-def handle_delete_action(client, body, ack, logger):
-    ack()
-    logger.debug(body)
+app.view({
+    "callback_id": "modal_view",
+    "type": "view_submission"
+})(ack = ack_submission, lazy = [handle_file_modal_view])
+
+@metrics.timeListener("delete_action")
+def handle_delete_action(client, body, logger):
     try:
         valueObj = json.loads(body["actions"][0]["value"])
         at.delete(AIRTABLE_NAME, valueObj["id"])
-        client.chat_postMessage(
-            channel = body["user"]["id"],
-            text =  "已成功刪除 "+ valueObj["date"] +" 日的運動記錄"
-        )
-        client.chat_update(
-            token = SLACK_BOT_TOKEN,
-            channel = body["container"]["channel_id"],
-            ts = body["container"]["message_ts"],
-            text = body["message"]["text"],
-            attachments =  [{
-                "blocks": [{
-                    "type": "context",
-                    "elements": [{
-                        "type": "plain_text",
-                        "text": "紀錄已刪除",
-                        "emoji": True
-                    }]
-                }]
-            }]
-        )
+        logic.removeUploadedDate(body["user"]["id"], valueObj["date"])
+        campaignStats.remove(body["user"]["id"], valueObj["date"])
+        if mirror is not None:
+            mirror.delete(valueObj["id"])
+        # 刪除通知直接寫進原本的紀錄訊息 (SlackDispatch 會合併成一個 chat_update)
+        with SlackDispatch(client, "delete_action", body["user"]["id"]) as out:
+            out.add("chat_postMessage",
+                channel = body["user"]["id"],
+                text =  "已成功刪除 "+ valueObj["date"] +" 日的運動記錄"
+            )
+            out.add("chat_update",
+                channel = body["container"]["channel_id"],
+                ts = body["container"]["message_ts"],
+                text = body["message"]["text"],
+                attachments = templates.RECORD_DELETED_ATTACHMENTS
+            )
     except SlackApiError as e:
         logger.error(f"Error posting message: {e}")
 
+app.action("delete_action")(ack = ack_only, lazy = [handle_delete_action])
+
 @app.action("showFile-1")
 def handle_actionId_0(ack, say):
     ack()
@@ -787,96 +591,32 @@ def handle_actionId_4(ack, say):
         logger.error(f"Error posting message: {e}")
 
 @app.message("")
+@metrics.timeListener("message")
 def handle_any_message(say, ack, logger, message, client):
     ack()
     try:
         # say("不要亂跟我說話！")
         client.chat_postMessage(
             channel = message["user"],
-            blocks = [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": "上傳居家運動紀錄請直接上傳一張圖片、並跟據指示填寫相關資料。如要查詢其他 EWC 活動資訊，請上 <https://pages.github.ibm.com/EWC/ewc-health/index.html|居家健康月活動網站> 或 <https://w3.ibm.com/w3publisher/ewc-taiwan|EWC 官網>"
-                    },
-                    "accessory": {
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "使用教學",
-                            "emoji": True
-                        },
-                        "style": "primary",
-                        "value": "click_me_123",
-                        "action_id": "showFile-1"
-                    }
-                }
-            ]
+            blocks = templates.HELP_BLOCKS
         )
     except SlackApiError as e:
         logger.error(f"Error posting message: {e}")
 
 @app.command("/ewc")
+@metrics.timeListener("/ewc")
 def handle_welcome_message(logger, command, ack, client):
+    args = command.get("text", "").split()
+    if args[:1] == ["stats"]:
+        # 直接用 ack 回覆 (只有本人看得到)
+        ack(**logic.statsReply(command["user_id"], args[1:]))
+        return
     ack()
     try:
         client.chat_postMessage(
             channel =  command["user_id"],
             text = "上傳成功囉，本次上傳紀錄如下",
-            blocks = [{
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": "歡迎使用 EWC Taiwan 居家健康月ー每日運動紀錄照片上傳機器人！請上傳圖片給我，開始記錄運動紀錄，具體操作方式請閱讀以下指引，若有任何疑慮，請聯絡 EWC Admin <@U01M8FR6ADQ>"
-                }
-            },
-            {
-                "type": "actions",
-                "elements": [
-                    {
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "使用教學",
-                            "emoji": True
-                        },
-                        "value": "click_me_123",
-                        "action_id": "showFile-1"
-                    },
-                    {
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "上傳規則與照片範例",
-                            "emoji": True
-                        },
-                        "value": "click_me_123",
-                        "action_id": "showFile-2"
-                    },
-                    {
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "無效照片範例",
-                            "emoji": True
-                        },
-                        "value": "click_me_123",
-                        "action_id": "showFile-4"
-                    },
-                    {
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "Q&A",
-                            "emoji": True
-                        },
-                        "value": "click_me_123",
-                        "url": "https://pages.github.ibm.com/EWC/ewc-health/index.html#faq",
-                        "action_id": "showFile-3"
-                    }
-                ]
-            }]
+            blocks = templates.WELCOME_BLOCKS
         )
     except SlackApiError as e:
         logger.error(f"Error posting message: {e}")
@@ -890,9 +630,19 @@ handler = SlackRequestHandler(app)
 def nothing():
     return ('', 204)
 
+@flask_app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return (metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE})
+
 @flask_app.route("/slack/events", methods=["POST","GET"])
 def slack_events():
-    return handler.handle(request)
+    if request.method != "POST":
+        return handler.handle(request)
+    start = time.perf_counter()
+    bolt_req = to_bolt_request(request)
+    bolt_resp = app.dispatch(bolt_req)
+    logic.observeRequest(bolt_req.body, time.perf_counter() - start, bolt_resp.status)
+    return to_flask_response(bolt_resp)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 3000))
@@ -0,0 +1,66 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchWriter:
+    """Write-behind queue that coalesces single record creates into bulk calls.
+
+    ``submit`` returns a Future resolved with the created record (including its
+    ``id``) once the batch containing it has been flushed. When a batch fails
+    with an error for which ``split_on(error)`` is true (one bad record), its
+    records are sent again one by one; any other error fails the whole batch.
+    """
+
+    def __init__(self, create_many, max_batch = 10, max_latency = 0.2, split_on = None):
+        self.create_many = create_many
+        self.split_on = split_on
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, record):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((record, future))
+        return future
+
+    def _ensure_started(self):
+        # gunicorn fork 之後才啟動 thread
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target = self._run, name = "airtable-batch-writer", daemon = True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout = remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            results = self.create_many([record for record, _ in batch])
+        except Exception as e:
+            if len(batch) > 1 and self.split_on is not None and self.split_on(e):
+                # 一筆壞資料讓整批被拒絕時逐筆重送，避免拖累其他人
+                for item in batch:
+                    self._flush([item])
+            else:
+                # 逾時或 5xx 時整批可能已經建立，重送會重複，直接回報錯誤
+                for _, future in batch:
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
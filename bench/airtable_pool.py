@@ -0,0 +1,74 @@
+"""Per-call latency of the Airtable client against a local keep-alive HTTP stub.
+
+    python bench/airtable_pool.py [calls]
+
+Compares the stock ``airtable.Airtable`` (a new connection per call) with
+``AirtableClient`` (pooled keep-alive session).
+"""
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import airtable
+from airtable_client import AirtableClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({"records": [{"id": "rec1", "fields": {"ID": "U1", "Date": "2021-07-01"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure(client, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        client.get("Table 1", fields = ["ID", "Date"], filter_by_formula = "{ID} = 'U1'")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    print("%-16s mean %.3f ms  p50 %.3f ms  p95 %.3f ms" % (
+        name,
+        statistics.mean(samples),
+        samples[len(samples) // 2],
+        samples[int(len(samples) * 0.95)]
+    ))
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    base_url = "http://127.0.0.1:%d/v0/appBench" % server.server_port
+
+    plain = airtable.Airtable("appBench", "key")
+    plain.base_url = base_url
+    pooled = AirtableClient("appBench", "key", rate = 1e9)
+    pooled.base_url = base_url
+
+    report("airtable.Airtable", measure(plain, calls))
+    report("AirtableClient", measure(pooled, calls))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
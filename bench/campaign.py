@@ -0,0 +1,42 @@
+"""Date validation cost: per-call strptime parsing vs the pre-parsed Campaign.
+
+    python bench/campaign.py [validations]
+"""
+import os
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from campaign import Campaign
+
+START_TIME = "2021-07-01"
+END_TIME = "2021-07-31"
+MINUS_DAY = "3"
+
+
+def legacyIsNotOver(sport_date):
+    # 舊版 isNotOver：每次重新 parse 設定
+    startDate = datetime.strptime(START_TIME, "%Y-%m-%d")
+    endDate = datetime.strptime(END_TIME, "%Y-%m-%d")
+    sportDateValue = datetime.strptime(sport_date, "%Y-%m-%d")
+    today = (datetime.utcnow() + timedelta(hours=8)).date()
+    today_n = (datetime.utcnow() - timedelta(days=int(MINUS_DAY))).date()
+    return (sportDateValue >= startDate and sportDateValue <= endDate) and (sportDateValue.date() >= today_n and sportDateValue.date() <= today)
+
+
+def main():
+    validations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    campaign = Campaign.fromConfig(START_TIME, END_TIME, MINUS_DAY)
+    dates = [(date(2021, 6, 20) + timedelta(days = i % 50)).isoformat() for i in range(validations)]
+
+    legacy = timeit.timeit(lambda: [legacyIsNotOver(d) for d in dates], number = 1)
+    parsed = timeit.timeit(lambda: [campaign.isValidDate(d) for d in dates], number = 1)
+    print("%d validations" % validations)
+    print("strptime per call  %.2f ms  (%.2f us each)" % (legacy * 1e3, legacy / validations * 1e6))
+    print("Campaign           %.2f ms  (%.2f us each)" % (parsed * 1e3, parsed / validations * 1e6))
+
+
+if __name__ == "__main__":
+    main()
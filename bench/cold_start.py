@@ -0,0 +1,88 @@
+"""Cold start benchmark: time from launching the app to its first ack.
+
+    python bench/cold_start.py [--runs 5] [--slack-latency 150] [--flow file_shared]
+        [--cmd "gunicorn -c gunicorn.conf.py app_run:flask_app --bind 127.0.0.1:{port}"]
+        [--env STARTUP_MODE=eager] [--env SLACK_AUTH_CACHE=/tmp/ewc-auth.json]
+
+Uses the same Slack/Airtable stub as bench/load_test.py. Each run starts the
+app, sends one signed request as soon as the port accepts connections (the
+way Slack's request wakes an idle dyno) and records the time from launch to
+the ack, plus how long that first request waited for it (gunicorn accepts
+connections before the worker has imported the app). The app is stopped
+between runs, so every run pays the full interpreter start and import cost.
+"""
+import argparse
+import shlex
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from load_test import ACK_DEADLINE, ROOT, StubHandler, StubServer, StubState, appEnv, freePort, payload, signedRequest
+
+
+def firstAck(url, process, flow, timeout = 30):
+    # 在 port 開始接受連線前一直重送，與 Slack 喚醒閒置 dyno 的請求相同
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("app exited with status %d" % process.returncode)
+        data, headers = signedRequest(*payload(flow, 0))
+        sent = time.monotonic()
+        try:
+            res = requests.post(url, data = data, headers = headers, timeout = 10)
+            return res.status_code, time.monotonic() - sent
+        except requests.ConnectionError:
+            time.sleep(0.01)
+    sys.exit("no ack within %ds" % timeout)
+
+
+def run(cmd, stub_url, flow, extra_env):
+    port = freePort()
+    env = appEnv(stub_url, port, extra_env)
+    start = time.monotonic()
+    process = subprocess.Popen(shlex.split(cmd.format(port = port)), cwd = ROOT, env = env,
+                               stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    try:
+        status, requestSeconds = firstAck("http://127.0.0.1:%d/slack/events" % port, process, flow)
+        return time.monotonic() - start, requestSeconds, status
+    finally:
+        # gunicorn 收到 SIGINT 直接結束，不等 graceful timeout
+        process.send_signal(signal.SIGINT)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type = int, default = 5)
+    parser.add_argument("--flow", default = "file_shared", help = "flow of the first request (see load_test.FLOWS)")
+    parser.add_argument("--slack-latency", type = float, default = 150, help = "ms added to every Slack call")
+    parser.add_argument("--cmd", default = "gunicorn -c gunicorn.conf.py app_run:flask_app --bind 127.0.0.1:{port}",
+                        help = "command that starts the app; {port} is replaced")
+    parser.add_argument("--env", action = "append", default = [], help = "extra KEY=VALUE for the app")
+    args = parser.parse_args()
+
+    StubState.slack_latency = args.slack_latency / 1000
+    stub = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target = stub.serve_forever, daemon = True).start()
+    stubUrl = "http://127.0.0.1:%d" % stub.server_port
+
+    print("slack latency %dms, %d runs, first request %s" % (args.slack_latency, args.runs, args.flow))
+    print("%4s %14s %14s %7s" % ("run", "launch→ack ms", "request ms", "status"))
+    totals = []
+    for n in range(args.runs):
+        total, requestSeconds, status = run(args.cmd, stubUrl, args.flow, args.env)
+        totals.append(total)
+        print("%4d %14.0f %14.0f %7d" % (n + 1, total * 1000, requestSeconds * 1000, status))
+    print("launch→ack ms: median %.0f, min %.0f, max %.0f; %d of %d over Slack's %.0fs deadline" % (
+        statistics.median(totals) * 1000, min(totals) * 1000, max(totals) * 1000,
+        sum(1 for total in totals if total > ACK_DEADLINE), len(totals), ACK_DEADLINE))
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Load test for /slack/events with local stand-ins for Slack and Airtable.
+
+    python bench/load_test.py [--requests 200] [--concurrency 20]
+        [--slack-latency 50] [--airtable-latency 150] [--airtable-429 0.05]
+        [--cmd "gunicorn app_run:flask_app --bind 127.0.0.1:{port}"]
+
+Starts one stub HTTP server that answers both the Slack Web API and the
+Airtable REST API, launches the app (``--cmd``, ``{port}`` is filled in)
+pointed at it through SLACK_API_URL / AIRTABLE_API_URL, and replays signed
+payloads for each flow in turn. Per flow it reports throughput, ack latency
+percentiles, acks slower than Slack's 3 second deadline, and the outbound
+calls each request caused once its lazy work has drained.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlencode, urlparse
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SIGNING_SECRET = "load-test-secret"
+ACK_DEADLINE = 3.0
+FLOWS = [
+    "file_shared", "message", "/ewc", "open_modal_action", "sport_duration_action",
+    "sport_date_action", "view_submission", "view_closed", "delete_action", "showFile-1"
+]
+
+
+class StubState:
+    slack_latency = 0.0
+    airtable_latency = 0.0
+    slack_429 = 0.0
+    airtable_429 = 0.0
+    calls = Counter()
+    lock = threading.Lock()
+
+    @classmethod
+    def count(cls, key):
+        with cls.lock:
+            cls.calls[key] += 1
+
+    @classmethod
+    def snapshot(cls):
+        with cls.lock:
+            return Counter(cls.calls)
+
+
+FILE_INFO = {
+    "id": "FLOAD", "name": "workout.png", "mimetype": "image/png", "original_w": 1024,
+    "thumb_720": "https://files.slack.com/files-tmb/T1-FLOAD/720.png",
+    "url_private": "https://files.slack.com/files-pri/T1-FLOAD/workout.png"
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, body, headers = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _handle(self):
+        path = urlparse(self.path).path
+        payload = self._body()
+        if path.startswith("/api/"):
+            method = path[len("/api/"):]
+            StubState.count(("slack", method))
+            time.sleep(StubState.slack_latency)
+            if random.random() < StubState.slack_429:
+                StubState.count(("slack", "429"))
+                return self._reply(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": "1"})
+            body = {"ok": True}
+            if method == "auth.test":
+                body.update(user_id = "UBOT", bot_id = "BBOT", team_id = "T1", user = "bot", url = "https://load.slack.com/")
+            elif method == "files.info":
+                body["file"] = FILE_INFO
+            elif method == "users.info":
+                body["user"] = {"id": "U1", "profile": {"display_name": "load"}}
+            elif method in ("chat.postMessage", "chat.update"):
+                body.update(channel = "D1", ts = "%.6f" % time.time())
+            elif method in ("views.open", "views.update"):
+                body["view"] = {"id": "V" + uuid.uuid4().hex[:8], "hash": uuid.uuid4().hex}
+            return self._reply(200, body)
+        if path.startswith("/v0/"):
+            StubState.count(("airtable", self.command))
+            time.sleep(StubState.airtable_latency)
+            if random.random() < StubState.airtable_429:
+                StubState.count(("airtable", "429"))
+                return self._reply(429, {"error": {"type": "RATE_LIMIT_REACHED"}})
+            if self.command == "GET":
+                return self._reply(200, {"records": []})
+            if self.command == "DELETE":
+                return self._reply(200, {"id": path.rsplit("/", 1)[-1], "deleted": True})
+            data = json.loads(payload or b"{}")
+            if "records" in data:
+                return self._reply(200, {"records": [dict(record, id = "rec" + uuid.uuid4().hex[:14]) for record in data["records"]]})
+            return self._reply(200, dict(data, id = "rec" + uuid.uuid4().hex[:14]))
+        self._reply(404, {})
+
+    do_GET = do_POST = do_DELETE = do_PATCH = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+    def handle_error(self, request, client_address):
+        # app 結束時還沒讀完的回應，不必印出 traceback
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def campaignToday():
+    # 與 app 相同的 UTC+8 日期
+    return date(1970, 1, 1) + timedelta(days = int((time.time() + 8 * 3600) // 86400))
+
+
+def fileBlock():
+    return {
+        "type": "section",
+        "block_id": "sport_image",
+        "text": {"type": "mrkdwn", "text": "*檔案名稱*\nworkout.png"},
+        "accessory": {"type": "image", "image_url": "https://proxy.example/720.png", "alt_text": "https://proxy.example/workout.png"}
+    }
+
+
+def viewBody(blocks, values = None):
+    return {
+        "id": "V" + uuid.uuid4().hex[:10], "hash": uuid.uuid4().hex, "callback_id": "modal_view",
+        "type": "modal", "blocks": blocks, "private_metadata": json.dumps(fileBlock()),
+        "state": {"values": values or {}}
+    }
+
+
+def payload(flow, n):
+    user = "ULOAD%05d" % n
+    today = campaignToday().isoformat()
+    base = {"team": {"id": "T1"}, "user": {"id": user}, "api_app_id": "A1", "token": "legacy", "trigger_id": "trig.%d" % n}
+    container = {"type": "message", "channel_id": "D1", "message_ts": "1.%d" % n}
+    if flow == "file_shared":
+        return "json", {"type": "event_callback", "event_id": "Ev" + uuid.uuid4().hex, "team_id": "T1", "api_app_id": "A1",
+                        "event": {"type": "file_shared", "file_id": "FLOAD", "user_id": user, "channel_id": "D" + user}}
+    if flow == "message":
+        return "json", {"type": "event_callback", "event_id": "Ev" + uuid.uuid4().hex, "team_id": "T1", "api_app_id": "A1",
+                        "event": {"type": "message", "channel_type": "im", "channel": "D1", "user": user, "text": "hi", "ts": "1.%d" % n}}
+    if flow == "/ewc":
+        return "form", {"command": "/ewc", "text": "", "user_id": user, "team_id": "T1", "channel_id": "D1",
+                        "api_app_id": "A1", "trigger_id": "trig.%d" % n}
+    if flow in ("view_submission", "view_closed"):
+        values = {
+            "sport_duration": {"sport_duration_action": {"type": "static_select", "selected_option": {"value": "30分鐘"}}},
+            "sport_date": {"sport_date_action": {"type": "datepicker", "selected_date": today}},
+            "sport_type": {"sport_type_action": {"type": "plain_text_input", "value": "跑步"}},
+            "comment": {"comment_action": {"type": "plain_text_input", "value": None}}
+        }
+        return "payload", dict(base, type = flow, view = viewBody([fileBlock()], values))
+    action = {"action_id": flow, "block_id": "b", "type": "button", "action_ts": "1.%d" % n}
+    body = dict(base, type = "block_actions", container = container, channel = {"id": "D1"},
+                message = {"text": "load test", "ts": "1.%d" % n}, actions = [action])
+    if flow == "open_modal_action":
+        action["value"] = json.dumps(fileBlock())
+    elif flow == "sport_duration_action":
+        action["selected_option"] = {"value": "30分鐘"}
+        body["view"] = viewBody([fileBlock(), {"type": "section", "block_id": "sport_duration"}])
+    elif flow == "sport_date_action":
+        action["selected_date"] = today
+        hint = {"type": "context", "elements": [{"type": "plain_text", "text": "hint"}]}
+        body["view"] = viewBody([fileBlock(), {"type": "section"}, {"type": "section"}, hint])
+    elif flow == "delete_action":
+        action["value"] = json.dumps({"id": "recLOAD%05d" % n, "date": today})
+    return "payload", body
+
+
+def signedRequest(kind, body):
+    if kind == "json":
+        data = json.dumps(body)
+        contentType = "application/json"
+    elif kind == "form":
+        data = urlencode(body)
+        contentType = "application/x-www-form-urlencoded"
+    else:
+        data = "payload=" + quote(json.dumps(body))
+        contentType = "application/x-www-form-urlencoded"
+    timestamp = str(int(time.time()))
+    signature = "v0=" + hmac.new(SIGNING_SECRET.encode(), ("v0:" + timestamp + ":" + data).encode(), hashlib.sha256).hexdigest()
+    return data.encode(), {
+        "Content-Type": contentType,
+        "X-Slack-Request-Timestamp": timestamp,
+        "X-Slack-Signature": signature
+    }
+
+
+def freePort():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def appEnv(stub_url, port, extra = ()):
+    today = campaignToday()
+    env = dict(os.environ,
+               SLACK_BOT_TOKEN = "xoxb-load-test",
+               SLACK_SIGNING_SECRET = SIGNING_SECRET,
+               SLACK_API_URL = stub_url + "/api/",
+               AIRTABLE_API_KEY = "keyLoadTest",
+               AIRTABLE_BASE = "appLoadTest",
+               AIRTABLE_NAME = "Table 1",
+               AIRTABLE_API_URL = stub_url + "/v0",
+               PROXY_URL = "proxy.example",
+               START_TIME = (today - timedelta(days = 30)).isoformat(),
+               END_TIME = (today + timedelta(days = 30)).isoformat(),
+               MINUS_DAY = "3",
+               REQUEST_LOG_LEVEL = "WARNING",
+               PORT = str(port))
+    env.update(item.split("=", 1) for item in extra)
+    return env
+
+
+def waitForApp(url, process, timeout = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            sys.exit("app exited with status %d" % process.returncode)
+        try:
+            requests.get(url, timeout = 1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    sys.exit("app did not start within %ds" % timeout)
+
+
+def waitForQuiet(settle = 1.0, timeout = 30):
+    # lazy listener / batch writer 的呼叫都送完才算這個 flow 結束
+    deadline = time.monotonic() + timeout
+    last = StubState.snapshot()
+    quietSince = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        current = StubState.snapshot()
+        if current != last:
+            last = current
+            quietSince = time.monotonic()
+        elif time.monotonic() - quietSince >= settle:
+            return
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def runFlow(url, flow, total, concurrency):
+    local = threading.local()
+
+    def send(n):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        data, headers = signedRequest(*payload(flow, n))
+        start = time.perf_counter()
+        try:
+            status = local.session.post(url, data = data, headers = headers, timeout = 30).status_code
+        except requests.RequestException:
+            status = None
+        return time.perf_counter() - start, status
+
+    before = StubState.snapshot()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = concurrency) as pool:
+        results = list(pool.map(send, range(total)))
+    elapsed = time.perf_counter() - start
+    waitForQuiet()
+    outbound = StubState.snapshot()
+    outbound.subtract(before)
+    return elapsed, results, +outbound
+
+
+def report(flow, elapsed, results, outbound, total):
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status != 200)
+    late = sum(1 for latency in latencies if latency > ACK_DEADLINE)
+    calls = ", ".join("%s %s %.2f" % (target, method, count / total) for (target, method), count in sorted(outbound.items())) or "-"
+    print("%-22s %6.1f %8.1f %8.1f %8.1f %8.1f %5d %6d  %s" % (
+        flow, total / elapsed,
+        statistics.mean(latencies) * 1000, percentile(latencies, 0.5) * 1000,
+        percentile(latencies, 0.95) * 1000, percentile(latencies, 0.99) * 1000,
+        late, errors, calls
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type = int, default = 200, help = "requests per flow")
+    parser.add_argument("--concurrency", type = int, default = 20)
+    parser.add_argument("--flows", default = ",".join(FLOWS), help = "comma separated, default: all")
+    parser.add_argument("--slack-latency", type = float, default = 50, help = "ms added to every Slack call")
+    parser.add_argument("--airtable-latency", type = float, default = 150, help = "ms added to every Airtable call")
+    parser.add_argument("--slack-429", type = float, default = 0.0, help = "fraction of Slack calls answered with 429")
+    parser.add_argument("--airtable-429", type = float, default = 0.0, help = "fraction of Airtable calls answered with 429")
+    parser.add_argument("--cmd", default = "gunicorn app_run:flask_app --bind 127.0.0.1:{port}",
+                        help = "command that starts the app; {port} is replaced")
+    parser.add_argument("--env", action = "append", default = [], help = "extra KEY=VALUE for the app")
+    args = parser.parse_args()
+
+    StubState.slack_latency = args.slack_latency / 1000
+    StubState.airtable_latency = args.airtable_latency / 1000
+    StubState.slack_429 = args.slack_429
+    StubState.airtable_429 = args.airtable_429
+
+    stub = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target = stub.serve_forever, daemon = True).start()
+    stubUrl = "http://127.0.0.1:%d" % stub.server_port
+
+    port = freePort()
+    env = appEnv(stubUrl, port, args.env)
+    process = subprocess.Popen(shlex.split(args.cmd.format(port = port)), cwd = ROOT, env = env)
+    try:
+        waitForApp("http://127.0.0.1:%d/" % port, process)
+        waitForQuiet()
+        url = "http://127.0.0.1:%d/slack/events" % port
+        print("slack latency %dms, airtable latency %dms, 429 slack %.0f%% airtable %.0f%%, %d requests x %d concurrent" % (
+            args.slack_latency, args.airtable_latency, args.slack_429 * 100, args.airtable_429 * 100, args.requests, args.concurrency))
+        print("%-22s %6s %8s %8s %8s %8s %5s %6s  %s" % ("flow", "req/s", "mean ms", "p50 ms", "p95 ms", "p99 ms", ">3s", "errors", "outbound calls per request"))
+        for flow in args.flows.split(","):
+            elapsed, results, outbound = runFlow(url, flow, args.requests, args.concurrency)
+            report(flow, elapsed, results, outbound, args.requests)
+        saved = [line for line in requests.get("http://127.0.0.1:%d/metrics" % port).text.splitlines()
+                 if line.startswith("ewc_slack_calls_saved_total")]
+        if saved:
+            print("\n".join(["", "Slack calls saved by SlackDispatch:"] + saved))
+    finally:
+        process.terminate()
+        process.wait()
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Render cost per message type for the Block Kit templates.
+
+    python bench/templates.py [iterations]
+
+Each row times building the payload plus ``json.dumps``, which is what the
+Slack client does with it before sending.
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import templates
+
+FILE_BLOCK = templates.fileBlock("IMG_0001.jpg", "https://proxy.example/thumb_720.jpg", "https://proxy.example/IMG_0001.jpg")
+RECORD = {
+    "ID": "U012345",
+    "Attachments": [{"url": "https://proxy.example/thumb_720.jpg"}],
+    "Duration": "30~40分鐘",
+    "Date": "2021-07-01",
+    "Type": "慢跑",
+    "Comment": None,
+    "URL": "https://proxy.example/IMG_0001.jpg",
+    "Timestamp": "2021-07-01T12:00:00"
+}
+RECORD_INFO = json.dumps({"id": "recXXXXXXXXXXXXXX", "date": "2021-07-01"})
+
+CASES = {
+    "open_modal_button": lambda: templates.openModalAttachments(json.dumps(FILE_BLOCK)),
+    "record_message": lambda: templates.recordAttachments(RECORD, RECORD_INFO),
+    "first_stage_view": lambda: templates.firstStageView(FILE_BLOCK, "ctxKey123456"),
+    "submit_view": lambda: templates.modalView([FILE_BLOCK, templates.DURATION_BLOCK, templates.DATE_BLOCK,
+                                                templates.dateHintBlock("hint"), templates.SPORT_TYPE_BLOCK,
+                                                templates.COMMENT_BLOCK], "ctxKey123456", submit = True),
+    "modal_opened": lambda: templates.MODAL_OPENED_ATTACHMENTS,
+    "help_message": lambda: templates.HELP_BLOCKS,
+    "welcome_message": lambda: templates.WELCOME_BLOCKS,
+}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print("%-20s %12s %12s" % ("message", "render us", "+dumps us"))
+    for name, render in CASES.items():
+        render_time = timeit.timeit(render, number = iterations) / iterations * 1e6
+        total_time = timeit.timeit(lambda: json.dumps(render()), number = iterations) / iterations * 1e6
+        print("%-20s %12.2f %12.2f" % (name, render_time, total_time))
+
+
+if __name__ == "__main__":
+    main()
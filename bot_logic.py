@@ -0,0 +1,114 @@
+"""Listener logic shared by the Flask bot (app_run) and the aiohttp bot (app_async).
+
+Nothing here calls Slack or Airtable: each app keeps its own listeners and
+clients, builds one ``BotLogic`` from its settings and calls into it for
+date validation, the uploaded-date cache, ``/ewc stats`` replies and
+per-request metrics.
+"""
+import threading
+
+import metrics
+import templates
+from ttl_cache import TTLCache
+
+
+def isNotRepeat(logger, sport_date, dateList):
+    try:
+        if sport_date not in dateList:
+            logger.debug("isNotRepeat!")
+            return True
+        else:
+            logger.debug("isRepeat!")
+            return False
+    except Exception as e:
+        logger.error(e)
+
+
+def uploadedDateQuery(user_id):
+    # 超過 100 筆時 Airtable 會分頁，兩個 app 都用 iterate 依 offset 逐頁取回，只取 Date 欄位
+    return {"fields": ['Date'], "filter_by_formula": "{ID} = '" + user_id + "'"}
+
+
+class BotLogic:
+
+    def __init__(self, campaign, context_store, uploaded_date_cache, campaign_stats, request_logger, admin_user_ids = ()):
+        self.campaign = campaign
+        self.context_store = context_store
+        self.uploaded_date_cache = uploaded_date_cache
+        self.campaign_stats = campaign_stats
+        self.request_logger = request_logger
+        self.admin_user_ids = set(admin_user_ids)
+        # 每次新增/刪除紀錄就加一，查詢開始後才變動的結果不寫進快取
+        self._generations = TTLCache(maxsize = uploaded_date_cache.maxsize, ttl = uploaded_date_cache.ttl)
+        self._generation_lock = threading.Lock()
+
+    def viewContextKey(self, view):
+        # 更新前就開啟的視窗沒有 private_metadata
+        return view.get("private_metadata") or self.context_store.put(view["blocks"][0])
+
+    def isNotOver(self, logger, sport_date):
+        logger.debug(sport_date)
+        if self.campaign.isValidDate(sport_date):
+            logger.debug("isNotOver!")
+            return True
+        else:
+            logger.debug("isOver!")
+            return False
+
+    def dateError(self, logger, sport_date, dateList):
+        # 回傳錯誤訊息，日期正確時回傳 None
+        if not self.isNotOver(logger, sport_date):
+            return "運動日期有誤（僅能上傳當日～" + str(self.campaign.minus_day) + "日前之資料，並且需指定活動期間內之日期）"
+        if not isNotRepeat(logger, sport_date, dateList):
+            return "運動日期有誤（不能上傳重複日期）"
+        return None
+
+    def cachedUploadedDates(self, logger, user_id):
+        cached = self.uploaded_date_cache.get(user_id)
+        if cached is None:
+            return None
+        logger.debug("uploaded date cache hit")
+        return sorted(cached)
+
+    def uploadedDatesGeneration(self, user_id):
+        """Take before starting a query; pass to ``storeUploadedDates`` with its records."""
+        return self._generations.get(user_id, 0)
+
+    def storeUploadedDates(self, user_id, records, generation = None):
+        """Cache the dates of ``records`` (as returned by ``uploadedDateQuery``) and return them.
+
+        Nothing is cached when a record was added or removed for the user
+        after ``generation`` was taken, since the query may have missed it.
+        """
+        dateSet = set()
+        for record in records:
+            if "Date" in record["fields"]:
+                dateSet.add(record["fields"]["Date"])
+        with self._generation_lock:
+            if generation is None or generation == self._generations.get(user_id, 0):
+                self.uploaded_date_cache.set(user_id, frozenset(dateSet))
+        return dateSet
+
+    def _changeUploadedDates(self, user_id, func):
+        with self._generation_lock:
+            self._generations.set(user_id, self._generations.get(user_id, 0) + 1)
+            self.uploaded_date_cache.update(user_id, func)
+
+    def addUploadedDate(self, user_id, sport_date):
+        self._changeUploadedDates(user_id, lambda dates: dates | {sport_date})
+
+    def removeUploadedDate(self, user_id, sport_date):
+        self._changeUploadedDates(user_id, lambda dates: dates - {sport_date})
+
+    def statsReply(self, user_id, args):
+        stats = self.campaign_stats
+        if not stats.ready:
+            return {"text": templates.STATS_NOT_READY_TEXT}
+        if args[:1] == ["all"] and user_id in self.admin_user_ids:
+            return templates.leaderboardReply(stats.leaderboard(), stats.durationCounts())
+        return templates.userStatsReply(stats.userSummary(user_id, self.campaign.today()))
+
+    def observeRequest(self, body, duration, status):
+        # Bolt 的 middleware 不是巢狀呼叫，ack 時間要在 HTTP 這層量
+        metrics.ACK_SECONDS.observe(duration, listener = metrics.listenerName(body))
+        self.request_logger.logRequest(body, duration, status)
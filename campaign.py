@@ -0,0 +1,48 @@
+"""Campaign window parsed once from the environment.
+
+Dates are kept as proleptic ordinals, so checking a submitted date is a
+dict lookup plus a couple of integer comparisons.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@dataclass(frozen = True)
+class Campaign:
+    start: int
+    end: int
+    minus_day: int
+    utc_offset: int = 8
+    hint_text: str = ""
+    ordinals: dict = field(default_factory = dict, repr = False, compare = False)
+
+    @classmethod
+    def fromConfig(cls, start_time, end_time, minus_day, utc_offset = 8):
+        startDate = date.fromisoformat(start_time)
+        endDate = date.fromisoformat(end_time)
+        ordinals = {}
+        day = startDate
+        while day <= endDate:
+            ordinals[day.isoformat()] = day.toordinal()
+            day += timedelta(days = 1)
+        hint_text = (
+            "請填寫" + str(startDate.month) + "/" + str(startDate.day) +
+            "～" + str(endDate.month) + "/" + str(endDate.day) +
+            "之間的日期，不能重複上傳相同日期，並且只能上傳當日～前" + str(int(minus_day)) + "天的日期"
+        )
+        return cls(startDate.toordinal(), endDate.toordinal(), int(minus_day), utc_offset, hint_text, ordinals)
+
+    def today(self, now = None):
+        # 活動當地 (UTC+8) 的今天
+        now = time.time() if now is None else now
+        return EPOCH_ORDINAL + int((now + self.utc_offset * 3600) // 86400)
+
+    def isValidDate(self, sport_date, now = None):
+        ordinal = self.ordinals.get(sport_date)
+        if ordinal is None:
+            return False
+        today = self.today(now)
+        return today - self.minus_day <= ordinal <= today
@@ -0,0 +1,97 @@
+"""Environment settings for both bots, checked in one pass.
+
+Every problem (a missing required variable, a number that does not parse,
+a malformed date) is collected while the settings are read, and ``check``
+raises a single ConfigError listing all of them, instead of the first
+KeyError or ValueError surfacing from deep inside the startup code.
+"""
+import os
+from datetime import date
+
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+
+class ConfigError(Exception):
+    pass
+
+
+class Env:
+    """Reads settings from ``os.environ`` and records what is wrong with them."""
+
+    def __init__(self, environ = None):
+        self.environ = os.environ if environ is None else environ
+        self.errors = []
+
+    def require(self, name, check = None):
+        """Return a required variable; ``check`` (e.g. ``int``) only validates it, the string is returned."""
+        value = self.environ.get(name)
+        if not value:
+            self.errors.append(name + " is not set")
+            return value
+        if check is not None:
+            try:
+                check(value)
+            except ValueError as e:
+                self.errors.append("%s=%r is not valid (%s)" % (name, value, e))
+        return value
+
+    def get(self, name, default = None, check = None):
+        """Return an optional variable; ``check`` validates a set value, which is replaced by ``default`` when it fails."""
+        value = self.environ.get(name, default)
+        if check is not None and value and value != default:
+            try:
+                check(value)
+            except ValueError as e:
+                self.errors.append("%s=%r is not valid (%s)" % (name, value, e))
+                return default
+        return value
+
+    def requireDateRange(self, start_name, end_name):
+        """Return two required ISO dates, recording an error when the start is after the end."""
+        start = self.require(start_name, date.fromisoformat)
+        end = self.require(end_name, date.fromisoformat)
+        try:
+            if date.fromisoformat(start) > date.fromisoformat(end):
+                self.errors.append("%s=%s is after %s=%s" % (start_name, start, end_name, end))
+        except (TypeError, ValueError):
+            # 未設定或格式錯誤，require 已經記錄過
+            pass
+        return start, end
+
+    def _convert(self, name, default, convert):
+        value = self.environ.get(name)
+        if value is None or value == "":
+            return default
+        try:
+            return convert(value)
+        except ValueError as e:
+            self.errors.append("%s=%r is not valid (%s)" % (name, value, e))
+            return default
+
+    def getInt(self, name, default):
+        return self._convert(name, default, int)
+
+    def getFloat(self, name, default):
+        return self._convert(name, default, float)
+
+    def getChoice(self, name, default, choices):
+        value = self.environ.get(name) or default
+        if value not in choices:
+            self.errors.append("%s=%r must be one of %s" % (name, value, ", ".join(choices)))
+            return default
+        return value
+
+    def expect(self, condition, message):
+        """Record ``message`` unless ``condition`` holds, for checks that combine several settings."""
+        if not condition:
+            self.errors.append(message)
+
+    def unsupported(self, name, reason):
+        """Record an error when ``name`` is set, for a setting this bot would otherwise ignore."""
+        if self.environ.get(name):
+            self.errors.append("%s is not supported %s" % (name, reason))
+
+    def check(self):
+        if self.errors:
+            raise ConfigError("invalid configuration:\n  " + "\n  ".join(self.errors))
+
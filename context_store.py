@@ -0,0 +1,96 @@
+"""Server-side storage for modal context (the uploaded file's section block).
+
+Only a short opaque key travels in button ``value`` and view
+``private_metadata``. Values that still hold inline JSON (messages sent
+before the store was enabled, or the ``inline`` backend) are decoded as-is.
+"""
+import json
+import secrets
+import sqlite3
+import threading
+import time
+
+from ttl_cache import TTLCache
+
+
+def newKey():
+    return secrets.token_urlsafe(9)
+
+
+def isInline(key):
+    return key.startswith("{")
+
+
+class InlineContextStore:
+    """Keeps the old behaviour: the whole context is the key."""
+
+    def put(self, value):
+        return json.dumps(value)
+
+    def get(self, key):
+        return json.loads(key)
+
+
+class MemoryContextStore:
+
+    def __init__(self, ttl, maxsize = 10000):
+        self.cache = TTLCache(maxsize = maxsize, ttl = ttl)
+
+    def put(self, value):
+        key = newKey()
+        self.cache.set(key, value)
+        return key
+
+    def get(self, key):
+        if isInline(key):
+            return json.loads(key)
+        return self.cache.get(key)
+
+
+class SqliteContextStore:
+    """Context shared by every worker that points at the same file."""
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread = False, isolation_level = None, timeout = 5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS contexts (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    def put(self, value):
+        key = newKey()
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT INTO contexts (key, value, expires) VALUES (?, ?, ?)", (key, json.dumps(value), now + self.ttl))
+            self._puts += 1
+            if self._puts % self.PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM contexts WHERE expires <= ?", (now,))
+        return key
+
+    def get(self, key):
+        if isInline(key):
+            return json.loads(key)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM contexts WHERE key = ? AND expires > ?", (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def checkSpec(spec):
+    """Raise ValueError unless ``spec`` is a CONTEXT_STORE that ``fromConfig`` accepts."""
+    if spec in (None, "", "inline", "memory"):
+        return
+    if not spec.startswith("sqlite:") or not spec[len("sqlite:"):]:
+        raise ValueError("expected inline, memory or sqlite:/path/to/file")
+
+
+def fromConfig(spec, ttl):
+    """``inline`` (default), ``memory`` or ``sqlite:/path/to/file``."""
+    checkSpec(spec)
+    if not spec or spec == "inline":
+        return InlineContextStore()
+    if spec == "memory":
+        return MemoryContextStore(ttl)
+    return SqliteContextStore(spec[len("sqlite:"):], ttl)
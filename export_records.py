@@ -0,0 +1,240 @@
+"""Export campaign records from Airtable to CSV or Parquet.
+
+    python export_records.py records.csv
+    python export_records.py --format parquet --names records/
+    python export_records.py --resume records.csv
+
+Records are read page by page and written out as they arrive, so memory use
+does not grow with the table. After every flushed page (CSV) or part file
+(Parquet) the next Airtable offset is saved to ``<output>.state``; rerun
+with ``--resume`` to continue from there after an interruption. Airtable
+offsets expire after a while, in which case the export must be restarted.
+
+Reads AIRTABLE_API_KEY, AIRTABLE_BASE and AIRTABLE_NAME from the
+environment, START_TIME/END_TIME to limit the export to the campaign, and
+SLACK_BOT_TOKEN for ``--names``. The export shares the base's request limit
+with the running bot, so it reads at EXPORT_RATE_LIMIT requests per second,
+by default a fifth of AIRTABLE_RATE_LIMIT. Parquet output needs pyarrow.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from airtable_client import AirtableClient
+
+FIELDS = ['ID', 'Date', 'Duration', 'Type', 'Comment', 'URL', 'Timestamp']
+PAGE_SIZE = 100
+
+
+def campaignFormula(start_time, end_time):
+    if not start_time or not end_time:
+        return None
+    return "AND(NOT(IS_BEFORE({Date}, '" + start_time + "')), NOT(IS_AFTER({Date}, '" + end_time + "')))"
+
+
+def exportRate(env):
+    # 與 bot 共用同一個 base 的額度，預設只用 bot 的 AIRTABLE_RATE_LIMIT 的五分之一
+    return env.getFloat('EXPORT_RATE_LIMIT', env.getFloat('AIRTABLE_RATE_LIMIT', 5) / 5)
+
+
+def iteratePages(at, table_name, filter_by_formula, offset = None):
+    # 與 Airtable.iterate 相同，但把每頁之後的 offset 一起回傳，才能從中斷處繼續
+    while True:
+        res = at.get(table_name, limit = PAGE_SIZE, offset = offset, fields = FIELDS,
+                     filter_by_formula = filter_by_formula)
+        offset = res.get("offset")
+        yield res["records"], offset
+        if offset is None:
+            return
+
+
+class UserNames:
+    """Slack user ID to display name, looked up once per user with a few parallel users.info calls."""
+
+    def __init__(self, client, workers = 4):
+        self.client = client
+        self.names = {}
+        self._executor = ThreadPoolExecutor(max_workers = workers)
+
+    def _lookup(self, user_id):
+        try:
+            profile = self.client.users_info(user = user_id)["user"]["profile"]
+            return profile.get("display_name") or profile.get("real_name") or user_id
+        except Exception as e:
+            print("users.info failed for %s: %s" % (user_id, e), file = sys.stderr)
+            return user_id
+
+    def resolve(self, user_ids):
+        missing = sorted({user_id for user_id in user_ids if user_id and user_id not in self.names})
+        for user_id, name in zip(missing, self._executor.map(self._lookup, missing)):
+            self.names[user_id] = name
+
+    def get(self, user_id):
+        return self.names.get(user_id, user_id)
+
+
+def loadState(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def saveState(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+class CsvSink:
+
+    def __init__(self, path, columns, state):
+        if state is None:
+            # Excel 需要 BOM 才會用 UTF-8 開啟中文
+            self.file = open(path, "w", newline = "", encoding = "utf-8-sig")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(columns)
+        else:
+            # 捨棄上次存檔之後才寫入的部分，避免重複
+            self.file = open(path, "r+", newline = "", encoding = "utf-8")
+            self.file.truncate(state["bytes"])
+            self.file.seek(0, os.SEEK_END)
+            self.writer = csv.writer(self.file)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def checkpoint(self):
+        # 每頁寫完就存檔，回傳值會寫進 state
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"bytes": os.fstat(self.file.fileno()).st_size}
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """Writes ``part-NNNNN.parquet`` files of about ``rows_per_part`` rows (whole pages) into a directory."""
+
+    def __init__(self, path, columns, state, rows_per_part = 10000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            sys.exit("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.columns = columns
+        self.rows_per_part = rows_per_part
+        self.part = 0 if state is None else state["part"]
+        self.rows = []
+        os.makedirs(path, exist_ok = True)
+        # 上次中斷時寫到一半的 part 重新產生
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:10]) >= self.part:
+                os.remove(os.path.join(path, name))
+
+    def write(self, rows):
+        self.rows.extend(rows)
+
+    def checkpoint(self):
+        # part 還沒寫滿時回傳 None，state 留在上一個 part
+        if len(self.rows) < self.rows_per_part:
+            return None
+        self._flush()
+        return {"part": self.part}
+
+    def _flush(self):
+        if not self.rows:
+            return
+        table = self.pa.table({column: [row[i] for row in self.rows] for i, column in enumerate(self.columns)})
+        self.pq.write_table(table, os.path.join(self.path, "part-%05d.parquet" % self.part))
+        self.part += 1
+        self.rows = []
+
+    def close(self):
+        self._flush()
+
+
+def export(at, table_name, sink, filter_by_formula, state_path, state = None, names = None):
+    offset = None if state is None else state["offset"]
+    total = 0 if state is None else state["rows"]
+    pending = 0
+    for records, next_offset in iteratePages(at, table_name, filter_by_formula, offset):
+        fields = [record["fields"] for record in records]
+        rows = [[record.get(field) for field in FIELDS] for record in fields]
+        if names is not None:
+            names.resolve(record.get("ID") for record in fields)
+            for row, record in zip(rows, fields):
+                row.append(names.get(record.get("ID")))
+        sink.write(rows)
+        pending += len(rows)
+        if next_offset is None:
+            break
+        saved = sink.checkpoint()
+        if saved is not None:
+            total += pending
+            pending = 0
+            saveState(state_path, dict(saved, offset = next_offset, rows = total))
+            print("exported %d records" % total, file = sys.stderr)
+    sink.close()
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return total + pending
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Export campaign records from Airtable.")
+    parser.add_argument("output", help = "CSV file, or directory for Parquet part files")
+    parser.add_argument("--format", choices = ["csv", "parquet"], default = "csv")
+    parser.add_argument("--resume", action = "store_true", help = "continue from <output>.state")
+    parser.add_argument("--names", action = "store_true", help = "add a Name column from Slack users.info")
+    parser.add_argument("--all", action = "store_true", help = "ignore START_TIME/END_TIME and export every record")
+    parser.add_argument("--rows-per-part", type = int, default = 10000, help = "Parquet rows per part file")
+    args = parser.parse_args(argv)
+
+    env = config.Env()
+    airtableBase = env.require('AIRTABLE_BASE')
+    airtableApiKey = env.require('AIRTABLE_API_KEY')
+    airtableName = env.require('AIRTABLE_NAME')
+    rate = exportRate(env)
+    env.expect(rate > 0, "EXPORT_RATE_LIMIT must be above 0")
+    slackBotToken = env.require('SLACK_BOT_TOKEN') if args.names else None
+    try:
+        env.check()
+    except config.ConfigError as e:
+        sys.exit(str(e))
+
+    at = AirtableClient(airtableBase, airtableApiKey, rate = rate)
+    filterByFormula = None if args.all else campaignFormula(env.get('START_TIME'), env.get('END_TIME'))
+
+    statePath = args.output.rstrip("/") + ".state"
+    state = loadState(statePath) if args.resume else None
+    if args.resume and state is None:
+        print("no saved state at %s, starting from the beginning" % statePath, file = sys.stderr)
+
+    names = None
+    columns = list(FIELDS)
+    if args.names:
+        from slack_sdk import WebClient
+        names = UserNames(WebClient(token = slackBotToken))
+        columns.append("Name")
+
+    if args.format == "parquet":
+        sink = ParquetSink(args.output, columns, state, rows_per_part = args.rows_per_part)
+    else:
+        sink = CsvSink(args.output, columns, state)
+
+    total = export(at, airtableName, sink, filterByFormula, statePath, state, names)
+    print("exported %d records to %s" % (total, args.output), file = sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Gunicorn settings for both bots, chosen from the environment.
+
+Every Slack request spends almost all of its time waiting on Slack or
+Airtable, so the sync app runs threaded (gthread) workers by default
+instead of gunicorn's one-request-at-a-time sync workers.
+
+    GUNICORN_WORKER_CLASS        gthread (default), gevent or sync; BOT_MODE=async always
+                                 uses the aiohttp worker
+    WEB_CONCURRENCY              worker processes (default 1)
+    GUNICORN_THREADS             threads per gthread worker (default 16)
+    GUNICORN_WORKER_CONNECTIONS  concurrent requests per gevent/aiohttp worker (default 100)
+    GUNICORN_TIMEOUT             seconds before a silent worker is restarted (default 30)
+    GUNICORN_GRACEFUL_TIMEOUT    seconds to finish in-flight requests on restart (default 30)
+    GUNICORN_KEEPALIVE           seconds to keep idle connections open (default 5)
+
+gevent needs ``pip install gevent``. Caches, dedupe, stats and the memory
+context store live in each worker process, so prefer more threads over
+more workers.
+"""
+import os
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "8000")
+
+if os.environ.get("BOT_MODE") == "async":
+    worker_class = "aiohttp.GunicornWebWorker"
+else:
+    worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 16)) if worker_class == "gthread" else 1
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+
+# Slack 3 秒內要收到 ack，單一請求卡超過 timeout 就重啟 worker
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# app 匯入時會啟動 mirror / stats 的背景 thread，fork 之後 thread 不會跟著過去，不能 preload
+preload_app = False
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")
@@ -0,0 +1,38 @@
+import hashlib
+import json
+
+import metrics
+from ttl_cache import TTLCache
+
+
+def requestKey(body):
+    """Key identifying one logical Slack request across retries, or None."""
+    requestType = body.get("type")
+    if requestType == "event_callback" and "event_id" in body:
+        return "event:" + body["event_id"]
+    if requestType == "view_submission":
+        view = body["view"]
+        # 被 response_action: errors 擋下後重新送出時 hash 不變，要連同填寫內容一起比對
+        state = json.dumps(view.get("state", {}).get("values", {}), sort_keys = True)
+        return "view:" + view["id"] + ":" + view["hash"] + ":" + hashlib.sha1(state.encode("utf-8")).hexdigest()
+    return None
+
+
+class Deduplicator:
+    """Remembers recently handled requests so retries can be acked without rework."""
+
+    def __init__(self, maxsize = 10000, ttl = 600):
+        self.seen = TTLCache(maxsize = maxsize, ttl = ttl)
+
+    def isDuplicate(self, body):
+        key = requestKey(body)
+        if key is None or self.seen.add(key):
+            return False
+        metrics.DUPLICATES.inc(type = body["type"])
+        return True
+
+    def forget(self, body):
+        # 被 response_action: errors 擋下的送出沒有做任何事，原封不動再送出一次時要重新檢查
+        key = requestKey(body)
+        if key is not None:
+            self.seen.pop(key)
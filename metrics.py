@@ -0,0 +1,157 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+Each gunicorn worker keeps its own numbers; scrape every worker (or run a
+single worker with threads) to get the full picture.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10)
+
+_registry = []
+
+
+def _labelText(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join('%s="%s"' % (name, str(value).replace('"', '\\"')) for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+
+    def __init__(self, name, documentation, labelnames = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.documentation), "# TYPE %s counter" % self.name]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append("%s%s %s" % (self.name, _labelText(self.labelnames, key), value))
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, labelnames = (), buckets = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, amount, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            # [每個 bucket 的次數, 總和, 總次數]
+            value = self._values.get(key)
+            if value is None:
+                value = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if amount <= bound:
+                    value[0][i] += 1
+            value[1] += amount
+            value[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.documentation), "# TYPE %s histogram" % self.name]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                for bound, bucketCount in zip(self.buckets, counts):
+                    lines.append("%s_bucket%s %d" % (self.name, _labelText(names, key + (bound,)), bucketCount))
+                lines.append("%s_bucket%s %d" % (self.name, _labelText(names, key + ("+Inf",)), count))
+                lines.append("%s_sum%s %s" % (self.name, _labelText(self.labelnames, key), total))
+                lines.append("%s_count%s %d" % (self.name, _labelText(self.labelnames, key), count))
+        return lines
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LISTENER_SECONDS = Histogram("ewc_listener_seconds", "Time spent in each Bolt listener", ["listener"])
+ACK_SECONDS = Histogram("ewc_ack_seconds", "Time from request dispatch to the ack response", ["listener"])
+SLACK_API_SECONDS = Histogram("ewc_slack_api_seconds", "Outbound Slack Web API call latency", ["method"])
+SLACK_WAIT_SECONDS = Histogram("ewc_slack_rate_limit_wait_seconds", "Time spent queued for a Slack method's rate limit tier", ["method"])
+SLACK_OVER_BUDGET = Counter("ewc_slack_over_budget_total", "Slack calls sent from a request thread after their tier's budget ran out", ["method"])
+AIRTABLE_SECONDS = Histogram("ewc_airtable_seconds", "Outbound Airtable request latency", ["operation"])
+AIRTABLE_WAIT_SECONDS = Histogram("ewc_airtable_rate_limit_wait_seconds", "Time spent waiting for the Airtable rate limiter")
+ERRORS = Counter("ewc_errors_total", "Errors by source and type", ["source", "type"])
+DUPLICATES = Counter("ewc_duplicate_requests_total", "Retried or duplicate requests dropped before any work", ["type"])
+SLACK_CALLS_SAVED = Counter("ewc_slack_calls_saved_total", "Slack calls avoided by deduplicating or folding an interaction's calls", ["flow"])
+COALESCED = Counter("ewc_coalesced_calls_total", "Calls that shared another caller's in-flight request", ["name"])
+
+
+def listenerName(body):
+    requestType = body.get("type")
+    if requestType == "event_callback":
+        return body.get("event", {}).get("type", requestType)
+    if requestType == "block_actions" and body.get("actions"):
+        return body["actions"][0].get("action_id", requestType)
+    if body.get("command"):
+        return body["command"]
+    return requestType or "unknown"
+
+
+def timeListener(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                ERRORS.inc(source = "listener", type = type(e).__name__)
+                raise
+            finally:
+                LISTENER_SECONDS.observe(time.perf_counter() - start, listener = name)
+        return wrapper
+    return decorator
+
+
+def timeAsyncListener(name):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                ERRORS.inc(source = "listener", type = type(e).__name__)
+                raise
+            finally:
+                LISTENER_SECONDS.observe(time.perf_counter() - start, listener = name)
+        return wrapper
+    return decorator
@@ -0,0 +1,156 @@
+"""Optional local SQLite mirror of the exercise table.
+
+The mirror is kept up to date by polling Airtable for records modified since
+the last sync, with a periodic full resync to pick up deletions made outside
+the bot. The bot also writes through on create/delete. A unique (user, date)
+constraint lets ``reserve`` reject a duplicate submission before it reaches
+Airtable, even when two submissions race.
+"""
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ['ID', 'Date', 'Duration', 'Type', 'Comment', 'URL', 'Timestamp']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    duration TEXT,
+    type TEXT,
+    comment TEXT,
+    url TEXT,
+    timestamp TEXT,
+    UNIQUE (user_id, date)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class AirtableMirror:
+
+    def __init__(self, path, at, table_name, sync_interval = 60, full_sync_interval = 3600):
+        self.at = at
+        self.table_name = table_name
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+        self.ready = False
+        self._conn = sqlite3.connect(path, check_same_thread = False, isolation_level = None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_full_sync = 0
+        # 全量同步期間 commit 的紀錄，掃描可能已經錯過，不能當成已被刪除
+        self._committed_during_sync = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target = self._run, name = "airtable-mirror", daemon = True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error("airtable mirror sync failed: %s", e)
+            time.sleep(self.sync_interval)
+
+    def sync(self):
+        full = not self.ready or time.monotonic() - self._last_full_sync >= self.full_sync_interval
+        started = datetime.utcnow()
+        since = self._getMeta("synced_at")
+        formula = None
+        if not full and since is not None:
+            formula = "IS_AFTER(LAST_MODIFIED_TIME(), '" + since + "')"
+        seen = set()
+        count = 0
+        if full:
+            with self._lock:
+                self._committed_during_sync = set()
+        try:
+            for record in self.at.iterate(self.table_name, fields = FIELDS, filter_by_formula = formula):
+                self.upsert(record["id"], record["fields"])
+                seen.add(record["id"])
+                count += 1
+            if full:
+                self._deleteMissing(seen)
+                self._last_full_sync = time.monotonic()
+        finally:
+            if full:
+                with self._lock:
+                    self._committed_during_sync = None
+        # 留一點重疊時間，避免漏掉同步期間被修改的紀錄
+        self._setMeta("synced_at", (started - timedelta(seconds = 5)).strftime("%Y-%m-%dT%H:%M:%S.000Z"))
+        self.ready = True
+        logger.debug("airtable mirror synced %d records (full=%s)", count, full)
+
+    def upsert(self, record_id, fields):
+        if "ID" not in fields or "Date" not in fields:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO records (id, user_id, date, duration, type, comment, url, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (record_id, fields["ID"], fields["Date"], fields.get("Duration"), fields.get("Type"),
+                 fields.get("Comment"), fields.get("URL"), fields.get("Timestamp"))
+            )
+
+    def delete(self, record_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM records WHERE id = ?", (record_id,))
+
+    def reserve(self, user_id, sport_date):
+        """Claim (user, date) before creating the record; returns a token or None if taken."""
+        token = "pending:" + uuid.uuid4().hex
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO records (id, user_id, date) VALUES (?, ?, ?)",
+                    (token, user_id, sport_date)
+                )
+        except sqlite3.IntegrityError:
+            return None
+        return token
+
+    def commit(self, token, record_id, fields):
+        with self._lock:
+            self._conn.execute("DELETE FROM records WHERE id = ?", (token,))
+            if self._committed_during_sync is not None:
+                self._committed_during_sync.add(record_id)
+        self.upsert(record_id, fields)
+
+    def release(self, token):
+        self.delete(token)
+
+    def uploadedDates(self, user_id):
+        with self._lock:
+            rows = self._conn.execute("SELECT date FROM records WHERE user_id = ?", (user_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def _deleteMissing(self, seen):
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute("SELECT id FROM records WHERE id NOT LIKE 'pending:%'")]
+            missing = [(record_id,) for record_id in ids
+                       if record_id not in seen and record_id not in self._committed_during_sync]
+            self._conn.executemany("DELETE FROM records WHERE id = ?", missing)
+
+    def _getMeta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _setMeta(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
@@ -0,0 +1,64 @@
+"""Token buckets shared by the Airtable and Slack clients."""
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``acquire`` blocks until a token is free."""
+
+    def __init__(self, rate, capacity = None):
+        self.rate = rate
+        # 每秒不到 1 個 token 時 (例如 5 req/s 由 8 個 worker 平分)，容量至少要能放下一個 token
+        self.capacity = max(1, capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _take(self, start):
+        # 拿到 token 回傳 0，否則回傳還要等幾秒
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                waited = now - start
+                self.wait_count += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def tryAcquire(self):
+        """Take a token if one is free right now; never waits."""
+        return not self._take(time.monotonic())
+
+    def acquire(self):
+        start = time.monotonic()
+        while True:
+            sleep = self._take(start)
+            if not sleep:
+                return time.monotonic() - start
+            time.sleep(sleep)
+
+    async def acquireAsync(self):
+        """Same as ``acquire`` without blocking the event loop."""
+        start = time.monotonic()
+        while True:
+            sleep = self._take(start)
+            if not sleep:
+                return time.monotonic() - start
+            await asyncio.sleep(sleep)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "count": self.wait_count,
+                "wait_total": self.wait_total,
+                "wait_avg": self.wait_total / self.wait_count if self.wait_count else 0.0,
+                "wait_max": self.wait_max
+            }
@@ -0,0 +1,75 @@
+"""Compact, sampled per-request logging.
+
+Each request produces at most one JSON line on the ``ewc.requests`` logger.
+Failed requests are always logged; successful ones are sampled. The full
+payload is only serialized when DEBUG is enabled.
+"""
+import json
+import logging
+import random
+import re
+
+import metrics
+
+logger = logging.getLogger("ewc.requests")
+
+URL_PATTERN = re.compile(r"https?://[^\s\"'<>|]+")
+
+
+def redactUrls(value):
+    if isinstance(value, str):
+        return URL_PATTERN.sub("<url>", value)
+    if isinstance(value, dict):
+        return {key: redactUrls(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redactUrls(item) for item in value]
+    return value
+
+
+class LazyJson:
+    """Serializes ``value`` only when the log record is actually formatted."""
+
+    def __init__(self, value, redact = False):
+        self.value = value
+        self.redact = redact
+
+    def __str__(self):
+        value = redactUrls(self.value) if self.redact else self.value
+        return json.dumps(value, ensure_ascii = False, default = str)
+
+
+def summarize(body):
+    summary = {"type": body.get("type"), "listener": metrics.listenerName(body)}
+    if "view" in body:
+        summary["callback_id"] = body["view"].get("callback_id")
+    user = body.get("user")
+    if isinstance(user, dict):
+        summary["user"] = user.get("id")
+    elif body.get("event"):
+        summary["user"] = body["event"].get("user_id") or body["event"].get("user")
+    else:
+        summary["user"] = body.get("user_id")
+    return summary
+
+
+class RequestLogger:
+
+    def __init__(self, sample_rate = 0.1, redact = True):
+        self.sample_rate = sample_rate
+        self.redact = redact
+
+    def logPayload(self, body):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("payload %s", LazyJson(body, self.redact))
+
+    def logRequest(self, body, duration, status):
+        failed = status is None or status >= 400
+        if not failed and random.random() >= self.sample_rate:
+            return
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        summary = summarize(body)
+        summary["duration_ms"] = round(duration * 1000, 1)
+        summary["outcome"] = "error" if failed else "ok"
+        summary["status"] = status
+        logger.info("%s", LazyJson(summary))
@@ -0,0 +1,73 @@
+"""Share one in-flight call between concurrent callers asking for the same key.
+
+Nothing is kept once the call finishes, so the next caller starts a fresh
+call; put a TTLCache in front when results may be reused for longer.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import metrics
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key across threads."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, func, executor = None):
+        # 同一個 key 已經有呼叫在進行時，直接共用它的 Future
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                metrics.COALESCED.inc(name = self.name)
+                return future
+            future = self._calls[key] = Future()
+
+        def run():
+            try:
+                future.set_result(func())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+
+        if executor is None:
+            run()
+        else:
+            executor.submit(run)
+        return future
+
+    def do(self, key, func):
+        return self.submit(key, func).result()
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls with the same key on one event loop."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+
+    def task(self, key, coro_func):
+        task = self._calls.get(key)
+        if task is not None:
+            metrics.COALESCED.inc(name = self.name)
+            return task
+        task = self._calls[key] = asyncio.ensure_future(coro_func())
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    def _forget(self, key, task):
+        self._calls.pop(key, None)
+        # 背景執行的呼叫失敗時可能沒有人 await，避免 "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key, coro_func):
+        # shield: 一個呼叫端被取消時不影響其他共用的呼叫端
+        return await asyncio.shield(self.task(key, coro_func))
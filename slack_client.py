@@ -0,0 +1,229 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from http.client import HTTPMessage, RemoteDisconnected
+from urllib.error import HTTPError, URLError
+
+import urllib3
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry import ConnectionErrorRetryHandler, RateLimitErrorRetryHandler
+from slack_sdk.web import SlackResponse
+
+import metrics
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# 每分鐘可呼叫的次數 (https://api.slack.com/docs/rate-limits)
+TIER_LIMITS = {2: 20, 3: 50, 4: 100}
+# 只排隊這些方法；views.open 的 trigger_id 3 秒就失效不能等，chat.postMessage 是每個
+# channel 每秒 1 則，超過時交給 RateLimitErrorRetryHandler 依 Retry-After 重送
+METHOD_TIERS = {
+    "chat.update": 3,
+    "chat.delete": 3,
+    "views.update": 4,
+    "files.info": 4,
+    "users.info": 4
+}
+
+
+class TierLimiter:
+    """One token bucket per Web API method, sized from the method's rate limit tier."""
+
+    def __init__(self, workers = 1, tiers = METHOD_TIERS):
+        # Slack 的限制是整個 app 共用，由所有 gunicorn worker 平分
+        self.buckets = {}
+        for method, tier in tiers.items():
+            perMinute = TIER_LIMITS[tier] / workers
+            self.buckets[method] = TokenBucket(perMinute / 60, capacity = max(1, perMinute))
+
+    def acquire(self, method, wait = True):
+        # wait=False: 沒有 token 時不排隊直接送出，超過限制時由 RateLimitErrorRetryHandler 依 Retry-After 處理
+        bucket = self.buckets.get(method)
+        if bucket is None:
+            return
+        if wait:
+            metrics.SLACK_WAIT_SECONDS.observe(bucket.acquire(), method = method)
+        elif not bucket.tryAcquire():
+            metrics.SLACK_OVER_BUDGET.inc(method = method)
+
+    async def acquireAsync(self, method):
+        bucket = self.buckets.get(method)
+        if bucket is not None:
+            metrics.SLACK_WAIT_SECONDS.observe(await bucket.acquireAsync(), method = method)
+
+
+def retryHandlers(max_retries):
+    return [
+        ConnectionErrorRetryHandler(max_retry_count = max_retries, error_types = [
+            URLError, ConnectionResetError, RemoteDisconnected,
+            # keep-alive 連線被 Slack 關掉時 urllib3 丟出的錯誤
+            urllib3.exceptions.NewConnectionError, urllib3.exceptions.ProtocolError
+        ]),
+        RateLimitErrorRetryHandler(max_retry_count = max_retries)
+    ]
+
+
+def _tokenKey(token):
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def loadAuthTest(path, token):
+    """auth.test result saved by ``saveAuthTest`` for this token, or None."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("token") != _tokenKey(token):
+        return None
+    return SlackResponse(client = None, http_verb = "POST", api_url = "auth.test", req_args = {},
+                         data = cached["data"], headers = {"x-oauth-scopes": cached.get("scopes")}, status_code = 200)
+
+
+def saveAuthTest(path, token, result):
+    if not path:
+        return
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump({"token": _tokenKey(token), "data": result.data, "scopes": result.headers.get("x-oauth-scopes")}, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("cannot save auth.test result to %s: %s", path, e)
+
+
+def authorizationMiddleware(middleware_list):
+    # Bolt 的 SingleTeamAuthorization 把第一次 auth.test 的結果存在 auth_test_result，之後的請求都沿用
+    for middleware in middleware_list:
+        if hasattr(middleware, "auth_test_result"):
+            return middleware
+    return None
+
+
+def prefetchAuthTest(client):
+    """Start auth.test in a background thread and return its Future."""
+    future = Future()
+
+    def call():
+        try:
+            future.set_result(client.auth_test())
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target = call, name = "auth-test", daemon = True).start()
+    return future
+
+
+def primeAuthorization(app, auth_test, cache_path = None):
+    """Give Bolt's authorization middleware the prefetched auth.test result.
+
+    Until ``auth_test`` finishes, a result cached in ``cache_path`` for the
+    same token is used, so early requests do not call auth.test themselves.
+    """
+    middleware = authorizationMiddleware(app._middleware_list)
+    if middleware is None:
+        return
+    token = app.client.token
+    if not auth_test.done():
+        middleware.auth_test_result = loadAuthTest(cache_path, token)
+
+    def done(future):
+        try:
+            result = future.result()
+        except Exception as e:
+            if isinstance(e, SlackApiError):
+                # token 已失效，不再沿用快取，讓 Bolt 每個請求都回報錯誤
+                middleware.auth_test_result = None
+            logger.error("auth.test failed, check SLACK_BOT_TOKEN: %s", e)
+            return
+        middleware.auth_test_result = result
+        saveAuthTest(cache_path, token, result)
+
+    auth_test.add_done_callback(done)
+
+
+def clientSettings(client):
+    return dict(
+        token = client.token,
+        base_url = client.base_url,
+        timeout = client.timeout,
+        ssl = client.ssl,
+        proxy = client.proxy,
+        headers = client.headers,
+        team_id = client.default_params.get("team_id"),
+        logger = client.logger,
+        retry_handlers = client.retry_handlers
+    )
+
+
+def recordError(e):
+    if isinstance(e, SlackApiError):
+        metrics.ERRORS.inc(source = "slack", type = e.response.get("error", "unknown"))
+    else:
+        metrics.ERRORS.inc(source = "slack", type = type(e).__name__)
+
+
+class InstrumentedWebClient(WebClient):
+    """WebClient that records latency and errors for every Web API method.
+
+    Requests go through one shared urllib3 pool so connections to Slack are
+    kept alive, and methods listed in METHOD_TIERS wait for their tier's
+    token bucket instead of running into 429s. A client with
+    ``queue_calls=False`` (the one Bolt passes to ack-side listeners) never
+    waits, so a drained bucket cannot hold up a request thread.
+    """
+
+    def __init__(self, *args, http_pool = None, rate_limiter = None, pool_size = 10, queue_calls = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http_pool = http_pool or urllib3.PoolManager(maxsize = pool_size, ssl_context = self.ssl)
+        self.rate_limiter = rate_limiter
+        self.queue_calls = queue_calls
+
+    @classmethod
+    def fromClient(cls, client, template = None, queue_calls = True):
+        # Bolt 每個請求都會新建 client，連線池與 rate limiter 沿用 app.client 的
+        template = template or client
+        return cls(**clientSettings(client), http_pool = getattr(template, "http_pool", None),
+                   rate_limiter = getattr(template, "rate_limiter", None), queue_calls = queue_calls)
+
+    def __deepcopy__(self, memo):
+        # lazy listener 會 deepcopy 請求的 context，複本要共用同一個連線池與 rate limiter；
+        # lazy listener 不在 ack 的 thread 上執行，可以排隊等 token
+        return self.fromClient(self)
+
+    def api_call(self, api_method, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(api_method, wait = self.queue_calls)
+        start = time.perf_counter()
+        try:
+            return super().api_call(api_method, **kwargs)
+        except Exception as e:
+            recordError(e)
+            raise
+        finally:
+            metrics.SLACK_API_SECONDS.observe(time.perf_counter() - start, method = api_method)
+
+    def _perform_urllib_http_request_internal(self, url, req):
+        if self.proxy is not None or not url.lower().startswith("http"):
+            return super()._perform_urllib_http_request_internal(url, req)
+        # 重試交給 retry_handlers，urllib3 不另外重試
+        res = self.http_pool.request(req.get_method(), url, body = req.data, headers = dict(req.header_items()),
+                                     timeout = self.timeout, retries = False, redirect = False)
+        headers = HTTPMessage()
+        for key, value in res.headers.items():
+            headers[key] = value
+        if not 200 <= res.status < 300:
+            # 與 urlopen 相同丟出 HTTPError，429 才會交給 RateLimitErrorRetryHandler
+            raise HTTPError(url, res.status, res.reason, headers, io.BytesIO(res.data))
+        if headers.get_content_type() == "application/gzip":
+            return {"status": res.status, "headers": headers, "body": res.data}
+        return {"status": res.status, "headers": headers, "body": res.data.decode(headers.get_content_charset() or "utf-8")}
@@ -0,0 +1,62 @@
+"""AsyncWebClient counterparts of slack_client, kept apart so the sync bot never imports aiohttp."""
+import time
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_async_handlers import AsyncConnectionErrorRetryHandler, AsyncRateLimitErrorRetryHandler
+from slack_sdk.web.async_client import AsyncWebClient
+
+import metrics
+from slack_client import clientSettings, recordError, authorizationMiddleware, loadAuthTest, saveAuthTest
+
+
+def asyncRetryHandlers(max_retries):
+    return [
+        AsyncConnectionErrorRetryHandler(max_retry_count = max_retries),
+        AsyncRateLimitErrorRetryHandler(max_retry_count = max_retries)
+    ]
+
+
+async def primeAuthorization(app, cache_path = None):
+    """Load a cached auth.test result into AsyncApp's authorization middleware, then check the token and refresh it."""
+    middleware = authorizationMiddleware(app._async_middleware_list)
+    if middleware is None:
+        return
+    token = app.client.token
+    if middleware.auth_test_result is None:
+        middleware.auth_test_result = loadAuthTest(cache_path, token)
+    try:
+        result = await app.client.auth_test()
+    except SlackApiError:
+        middleware.auth_test_result = None
+        raise
+    middleware.auth_test_result = result
+    saveAuthTest(cache_path, token, result)
+
+
+class AsyncInstrumentedWebClient(AsyncWebClient):
+
+    def __init__(self, *args, rate_limiter = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+
+    @classmethod
+    def fromClient(cls, client, template = None):
+        template = template or client
+        settings = clientSettings(client)
+        settings["session"] = client.session
+        return cls(**settings, rate_limiter = getattr(template, "rate_limiter", None))
+
+    def __deepcopy__(self, memo):
+        return self.fromClient(self)
+
+    async def api_call(self, api_method, **kwargs):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquireAsync(api_method)
+        start = time.perf_counter()
+        try:
+            return await super().api_call(api_method, **kwargs)
+        except Exception as e:
+            recordError(e)
+            raise
+        finally:
+            metrics.SLACK_API_SECONDS.observe(time.perf_counter() - start, method = api_method)
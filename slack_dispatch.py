@@ -0,0 +1,113 @@
+"""Per-interaction batching of outbound Slack Web API calls.
+
+A listener queues its calls on a dispatcher and they are sent together when
+the ``with`` block exits: identical calls are sent once, a plain-text
+``chat.postMessage`` to the user next to a ``chat.update`` of a message in
+the same DM is folded into that update, and the remaining calls run in
+parallel. Only queue calls that do not depend on each other's results.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# chat.postMessage 只有這些參數時才能合併進 chat.update
+_FOLDABLE_POST_ARGS = frozenset(["channel", "text", "token"])
+
+
+def _callKey(method, kwargs):
+    return method + ":" + json.dumps(kwargs, sort_keys = True, default = str)
+
+
+def planCalls(calls, user_id):
+    """Return the calls to send after dedupe and folding, and how many were saved."""
+    planned = []
+    seen = set()
+    for method, kwargs in calls:
+        key = _callKey(method, kwargs)
+        if key not in seen:
+            seen.add(key)
+            planned.append((method, dict(kwargs)))
+
+    updates = [kwargs for method, kwargs in planned if method == "chat_update" and str(kwargs.get("channel", "")).startswith("D")]
+    folded = []
+    for method, kwargs in planned:
+        if method == "chat_postMessage" and updates and kwargs.get("channel") in (user_id, updates[0]["channel"]) \
+                and set(kwargs) <= _FOLDABLE_POST_ARGS and "text" in kwargs:
+            # 新訊息的內容直接寫進原本那則訊息，不另外發一則
+            updates[0]["text"] = kwargs["text"]
+            continue
+        folded.append((method, kwargs))
+    return folded, len(calls) - len(folded)
+
+
+class SlackDispatch:
+    """Collects one interaction's Slack calls and sends them in parallel on exit."""
+
+    executor = ThreadPoolExecutor(max_workers = 8, thread_name_prefix = "slack-dispatch")
+
+    def __init__(self, client, flow, user_id = None):
+        self.client = client
+        self.flow = flow
+        self.user_id = user_id
+        self.calls = []
+
+    def add(self, method, **kwargs):
+        self.calls.append((method, kwargs))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.send()
+
+    def send(self):
+        calls, saved = planCalls(self.calls, self.user_id)
+        self.calls = []
+        if saved:
+            metrics.SLACK_CALLS_SAVED.inc(saved, flow = self.flow)
+        # 第一個呼叫在目前的 thread 送出，其餘丟到共用的 pool
+        futures = [self.executor.submit(getattr(self.client, method), **kwargs) for method, kwargs in calls[1:]]
+        try:
+            if calls:
+                method, kwargs = calls[0]
+                getattr(self.client, method)(**kwargs)
+        finally:
+            errors = []
+            for future in futures:
+                if future.exception() is not None:
+                    errors.append(future.exception())
+        if errors:
+            raise errors[0]
+
+
+class AsyncSlackDispatch:
+    """SlackDispatch for AsyncWebClient; calls are sent with asyncio.gather."""
+
+    def __init__(self, client, flow, user_id = None):
+        self.client = client
+        self.flow = flow
+        self.user_id = user_id
+        self.calls = []
+
+    def add(self, method, **kwargs):
+        self.calls.append((method, kwargs))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.send()
+
+    async def send(self):
+        calls, saved = planCalls(self.calls, self.user_id)
+        self.calls = []
+        if saved:
+            metrics.SLACK_CALLS_SAVED.inc(saved, flow = self.flow)
+        results = await asyncio.gather(*[getattr(self.client, method)(**kwargs) for method, kwargs in calls], return_exceptions = True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
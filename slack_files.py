@@ -0,0 +1,26 @@
+"""Helpers for the subset of Slack file metadata the bot uses."""
+
+# 教學用的檔案，使用者點按鈕時也會觸發 file_shared
+TUTORIAL_FILE_IDS = frozenset(["F028880B3QQ", "F027X9F0F2M", "F02BDP60S6L"])
+
+FILE_FIELDS = ("mimetype", "original_w", "thumb_360", "thumb_480", "thumb_720", "url_private", "name")
+
+# 由大到小，選第一個原圖寬度足夠的縮圖
+THUMBNAIL_SIZES = ((720, "thumb_720"), (480, "thumb_480"), (360, "thumb_360"))
+
+def isUserUpload(event):
+    # 只處理私訊中上傳的檔案，教學檔案不用查 files_info
+    return event["channel_id"][0] == "D" and event["file_id"] not in TUTORIAL_FILE_IDS
+
+def fileSubset(file):
+    return {key: file[key] for key in FILE_FIELDS if key in file}
+
+def isImage(file):
+    return file.get("mimetype", "").split("/")[0] == "image"
+
+def selectThumbnail(file):
+    width = file.get("original_w") or 0
+    for minWidth, key in THUMBNAIL_SIZES:
+        if width >= minWidth and key in file:
+            return file[key]
+    return file["url_private"]
@@ -0,0 +1,118 @@
+"""Per-user exercise aggregates kept in memory for ``/ewc stats``.
+
+The aggregates are built from one streaming scan of the table and kept
+current by the bot's own inserts and deletes, so a stats reply never has to
+read Airtable. Rebuilding periodically picks up edits made directly in
+Airtable.
+"""
+import threading
+from collections import Counter
+from datetime import date
+
+
+def _ordinal(sport_date):
+    try:
+        return date.fromisoformat(sport_date).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+class CampaignStats:
+    """Uploaded days per user and record counts per duration option."""
+
+    def __init__(self):
+        self.ready = False
+        # user_id -> {date: duration}
+        self._users = {}
+        self._durations = Counter()
+        self._journal = None
+        self._lock = threading.Lock()
+
+    def rebuild(self, records):
+        """Replace the aggregates with a scan of ``records`` (an iterable of field dicts)."""
+        users, durations = self._begin()
+        try:
+            for fields in records:
+                self._apply(users, durations, "add", fields.get("ID"), fields.get("Date"), fields.get("Duration"))
+            return self._finish(users, durations)
+        finally:
+            self._end()
+
+    async def rebuildAsync(self, records):
+        """Same as ``rebuild`` for an async iterable of field dicts."""
+        users, durations = self._begin()
+        try:
+            async for fields in records:
+                self._apply(users, durations, "add", fields.get("ID"), fields.get("Date"), fields.get("Duration"))
+            return self._finish(users, durations)
+        finally:
+            self._end()
+
+    def _begin(self):
+        with self._lock:
+            # 掃描期間的新增/刪除先記下來，換上新資料時再套用一次
+            self._journal = []
+        return {}, Counter()
+
+    def _finish(self, users, durations):
+        with self._lock:
+            for change in self._journal:
+                self._apply(users, durations, *change)
+            self._users = users
+            self._durations = durations
+            self.ready = True
+        return sum(len(days) for days in users.values())
+
+    def _end(self):
+        with self._lock:
+            self._journal = None
+
+    def add(self, user_id, sport_date, duration):
+        self._change("add", user_id, sport_date, duration)
+
+    def remove(self, user_id, sport_date):
+        self._change("remove", user_id, sport_date, None)
+
+    def _change(self, *change):
+        with self._lock:
+            self._apply(self._users, self._durations, *change)
+            if self._journal is not None:
+                self._journal.append(change)
+
+    @staticmethod
+    def _apply(users, durations, op, user_id, sport_date, duration):
+        if not user_id or not sport_date:
+            return
+        days = users.setdefault(user_id, {})
+        if op == "add":
+            if sport_date not in days:
+                days[sport_date] = duration
+                durations[duration] += 1
+        elif sport_date in days:
+            duration = days.pop(sport_date)
+            durations[duration] -= 1
+            if durations[duration] <= 0:
+                del durations[duration]
+
+    def userSummary(self, user_id, today):
+        """Total days and the current streak ending today (or yesterday) for one user."""
+        with self._lock:
+            dates = list(self._users.get(user_id, ()))
+        ordinals = {ordinal for ordinal in map(_ordinal, dates) if ordinal is not None}
+        # 今天還沒上傳不算中斷
+        day = today if today in ordinals else today - 1
+        streak = 0
+        while day in ordinals:
+            streak += 1
+            day -= 1
+        return {"total": len(ordinals), "streak": streak}
+
+    def leaderboard(self, limit = 10):
+        with self._lock:
+            totals = [(user_id, len(days)) for user_id, days in self._users.items() if days]
+        totals.sort(key = lambda item: (-item[1], item[0]))
+        return totals[:limit]
+
+    def durationCounts(self):
+        with self._lock:
+            return dict(self._durations)
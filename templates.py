@@ -0,0 +1,321 @@
+"""Block Kit templates for the bot's messages and modal.
+
+Static parts are built once at import and shared between requests; the
+render functions only copy the pieces that hold per-request values. The
+returned structures must be treated as read-only.
+"""
+
+COLOR = "#f2c744"
+
+DURATION_OPTIONS = ["30分鐘", "30~40分鐘", "40~50分鐘", "50~60分鐘", "超過1小時"]
+
+def plainText(text):
+    return {
+        "type": "plain_text",
+        "text": text,
+        "emoji": True
+    }
+
+def contextAttachments(text):
+    return [{
+        "blocks": [{
+            "type": "context",
+            "elements": [plainText(text)]
+        }]
+    }]
+
+MODAL_OPENED_ATTACHMENTS = contextAttachments("編輯視窗已開啟")
+RECORD_DELETED_ATTACHMENTS = contextAttachments("紀錄已刪除")
+
+_OPEN_MODAL_BUTTON = {
+    "type": "button",
+    "text": plainText("填寫詳細資料"),
+    "style": "primary",
+    "action_id": "open_modal_action"
+}
+
+def openModalAttachments(contextKey):
+    return [{
+        "color": COLOR,
+        "blocks": [{
+            "type": "actions",
+            "elements": [dict(_OPEN_MODAL_BUTTON, value = contextKey)]
+        }]
+    }]
+
+def fileBlock(fileName, thumbUrl, fileLink):
+    return {
+        "type": "section",
+        "block_id": "sport_image",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*檔案名稱*\n" + fileName
+        },
+        "accessory": {
+            "type": "image",
+            "image_url": thumbUrl,
+            "alt_text": fileLink
+        }
+    }
+
+_DELETE_CONFIRM_STATIC = {
+    "title": {
+        "type": "plain_text",
+        "text": "真的要刪除嗎"
+    },
+    "confirm": {
+        "type": "plain_text",
+        "text": "Delete"
+    },
+    "deny": {
+        "type": "plain_text",
+        "text": "Cancel"
+    }
+}
+
+_DELETE_BUTTON = {
+    "type": "button",
+    "text": plainText("刪除這筆紀錄"),
+    "style": "danger",
+    "action_id": "delete_action"
+}
+
+def recordAttachments(record, recordInfoString):
+    # Handle Optional Column
+    comment = record["Comment"] if record["Comment"] is not None else ""
+    return [{
+        "color": COLOR,
+        "blocks": [{
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": "*運動時間：* " + record["Duration"] +
+                    "\n\n*運動日期：* " + record["Date"] +
+                    "\n\n*運動項目：* " + record["Type"] +
+                    "\n\n*備註：* " + comment
+            },
+            "accessory": {
+                "type": "image",
+                "image_url": record["Attachments"][0]["url"],
+                "alt_text": "Thumbnail"
+            }
+        },
+        {
+            "type": "actions",
+            "elements": [dict(
+                _DELETE_BUTTON,
+                value = recordInfoString,
+                confirm = dict(_DELETE_CONFIRM_STATIC, text = {
+                    "type": "mrkdwn",
+                    "text": "刪除 " + record["Date"] + "日 的運動紀錄"
+                })
+            )]
+        }]
+    }]
+
+MODAL_TITLE = plainText("填寫運動紀錄")
+MODAL_SUBMIT = plainText("Submit")
+MODAL_CLOSE = plainText("Cancel")
+
+DURATION_BLOCK = {
+    "type": "section",
+    "block_id": "sport_duration",
+    "text": {
+        "type": "mrkdwn",
+        "text": "*運動時間*"
+    },
+    "accessory": {
+        "type": "static_select",
+        "placeholder": plainText("選擇運動時間"),
+        "options": [{
+            "text": plainText(duration),
+            "value": duration
+        } for duration in DURATION_OPTIONS],
+        "action_id": "sport_duration_action"
+    }
+}
+
+DATE_BLOCK = {
+    "type": "section",
+    "block_id": "sport_date",
+    "text": {
+        "type": "mrkdwn",
+        "text": "*運動日期*"
+    },
+    "accessory": {
+        "type": "datepicker",
+        "placeholder": plainText("Select a date"),
+        "action_id": "sport_date_action",
+    }
+}
+
+def dateHintBlock(text):
+    return {
+        "type": "context",
+        "elements": [plainText(text)]
+    }
+
+SPORT_TYPE_BLOCK = {
+    "type": "input",
+    "block_id": "sport_type",
+    "element": {
+        "type": "plain_text_input",
+        "action_id": "sport_type_action"
+    },
+    "label": plainText("運動項目")
+}
+
+COMMENT_BLOCK = {
+    "type": "input",
+    "block_id": "comment",
+    "element": {
+        "type": "plain_text_input",
+        "action_id": "comment_action"
+    },
+    "optional": True,
+    "label": plainText("備註")
+}
+
+# views.update 會整個取代 view，private_metadata 每次都要帶上
+def modalView(blocks, contextKey, submit = False):
+    view = {
+        "type": "modal",
+        "callback_id": "modal_view",
+        "notify_on_close": True,
+        "title": MODAL_TITLE,
+        "blocks": blocks,
+        "private_metadata": contextKey
+    }
+    if submit:
+        view["submit"] = MODAL_SUBMIT
+        view["close"] = MODAL_CLOSE
+    return view
+
+def firstStageView(fileBlockInfo, contextKey):
+    # 顯示第一階段
+    return modalView([fileBlockInfo, DURATION_BLOCK], contextKey)
+
+# 單一階段：所有欄位一次顯示，日期在送出時才檢查 (response_action: errors)
+SINGLE_DURATION_BLOCK = {
+    "type": "input",
+    "block_id": "sport_duration",
+    "element": dict(DURATION_BLOCK["accessory"]),
+    "label": plainText("運動時間")
+}
+
+SINGLE_DATE_BLOCK = {
+    "type": "input",
+    "block_id": "sport_date",
+    "element": dict(DATE_BLOCK["accessory"]),
+    "label": plainText("運動日期")
+}
+
+def singleStageView(fileBlockInfo, contextKey, hintBlock):
+    return modalView([
+        fileBlockInfo,
+        SINGLE_DURATION_BLOCK,
+        SINGLE_DATE_BLOCK,
+        hintBlock,
+        SPORT_TYPE_BLOCK,
+        COMMENT_BLOCK
+    ], contextKey, submit = True)
+
+def errorView(blocks, contextKey):
+    return {
+        "type": "workflow_step",
+        "callback_id": "modal_view",
+        "blocks": blocks,
+        "submit_disabled": True,
+        "private_metadata": contextKey
+    }
+
+STATS_NOT_READY_TEXT = "統計資料準備中，請稍後再試"
+
+def userStatsReply(summary):
+    text = "*累積運動天數：* " + str(summary["total"]) + " 天\n*目前連續天數：* " + str(summary["streak"]) + " 天"
+    return {
+        "text": text,
+        "blocks": [{
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": text
+            }
+        }]
+    }
+
+def leaderboardReply(leaderboard, durationCounts):
+    ranking = "\n".join(
+        str(rank) + ". <@" + userId + "> " + str(total) + " 天"
+        for rank, (userId, total) in enumerate(leaderboard, 1)
+    ) or "尚無紀錄"
+    durations = "\n".join(
+        duration + "： " + str(durationCounts.get(duration, 0)) + " 筆"
+        for duration in DURATION_OPTIONS
+    )
+    return {
+        "text": "運動天數排行榜",
+        "blocks": [{
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": "*運動天數排行榜*\n" + ranking
+            }
+        },
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": "*各運動時間筆數*\n" + durations
+            }
+        }]
+    }
+
+_TUTORIAL_BUTTON = {
+    "type": "button",
+    "text": plainText("使用教學"),
+    "value": "click_me_123",
+    "action_id": "showFile-1"
+}
+
+HELP_BLOCKS = [{
+    "type": "section",
+    "text": {
+        "type": "mrkdwn",
+        "text": "上傳居家運動紀錄請直接上傳一張圖片、並跟據指示填寫相關資料。如要查詢其他 EWC 活動資訊，請上 <https://pages.github.ibm.com/EWC/ewc-health/index.html|居家健康月活動網站> 或 <https://w3.ibm.com/w3publisher/ewc-taiwan|EWC 官網>"
+    },
+    "accessory": dict(_TUTORIAL_BUTTON, style = "primary")
+}]
+
+WELCOME_BLOCKS = [{
+    "type": "section",
+    "text": {
+        "type": "mrkdwn",
+        "text": "歡迎使用 EWC Taiwan 居家健康月ー每日運動紀錄照片上傳機器人！請上傳圖片給我，開始記錄運動紀錄，具體操作方式請閱讀以下指引，若有任何疑慮，請聯絡 EWC Admin <@U01M8FR6ADQ>"
+    }
+},
+{
+    "type": "actions",
+    "elements": [
+        _TUTORIAL_BUTTON,
+        {
+            "type": "button",
+            "text": plainText("上傳規則與照片範例"),
+            "value": "click_me_123",
+            "action_id": "showFile-2"
+        },
+        {
+            "type": "button",
+            "text": plainText("無效照片範例"),
+            "value": "click_me_123",
+            "action_id": "showFile-4"
+        },
+        {
+            "type": "button",
+            "text": plainText("Q&A"),
+            "value": "click_me_123",
+            "url": "https://pages.github.ibm.com/EWC/ewc-health/index.html#faq",
+            "action_id": "showFile-3"
+        }
+    ]
+}]
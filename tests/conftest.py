@@ -0,0 +1,32 @@
+import inspect
+import os
+import sys
+
+import pytest
+
+# 測試直接 import 專案根目錄的模組
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def failing(monkeypatch):
+    """Make a client's ``_send`` raise ``errors`` in turn, then succeed; returns the list of sent methods.
+
+    Works for AirtableClient and AsyncAirtable alike.
+    """
+    def fail(client, *errors):
+        sent = []
+        remaining = list(errors)
+
+        def send(method, *args, **kwargs):
+            sent.append(method)
+            if remaining:
+                raise remaining.pop(0)
+            return {"id": "rec1"}
+
+        async def sendAsync(method, *args, **kwargs):
+            return send(method, *args, **kwargs)
+
+        monkeypatch.setattr(client, "_send", sendAsync if inspect.iscoroutinefunction(client._send) else send)
+        return sent
+    return fail
@@ -0,0 +1,107 @@
+import socket
+import threading
+
+import pytest
+import requests
+
+from airtable_client import AirtableClient, AirtableError
+
+
+@pytest.fixture
+def client():
+    return AirtableClient("appTest", "keyTest", rate = 1000, max_retries = 3, backoff = 0)
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ReadTimeout("read timed out"),
+    AirtableError(500, "server error"),
+    AirtableError(503, "unavailable")
+])
+def test_post_is_not_retried_once_it_may_have_reached_airtable(client, failing, error):
+    sent = failing(client, error)
+    with pytest.raises(type(error)):
+        client.batch_create("Table 1", [{"Date": "2026-05-01"}])
+    assert sent == ["POST"]
+
+
+@pytest.mark.parametrize("error", [
+    AirtableError(429, "rate limited"),
+    requests.exceptions.ConnectTimeout("connect timed out")
+])
+def test_post_is_retried_when_nothing_was_created(client, failing, error):
+    sent = failing(client, error)
+    client._Airtable__request("POST", "Table 1", payload = "{}")
+    assert sent == ["POST", "POST"]
+
+
+@pytest.mark.parametrize("method", ["GET", "DELETE"])
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ReadTimeout("read timed out"),
+    AirtableError(502, "bad gateway"),
+    AirtableError(429, "rate limited")
+])
+def test_get_and_delete_are_retried(client, failing, method, error):
+    sent = failing(client, error)
+    assert client._Airtable__request(method, "Table 1") == {"id": "rec1"}
+    assert sent == [method, method]
+
+
+def test_client_errors_are_not_retried(client, failing):
+    sent = failing(client, AirtableError(422, "invalid"))
+    with pytest.raises(AirtableError):
+        client._Airtable__request("GET", "Table 1")
+    assert sent == ["GET"]
+
+
+def test_retries_stop_at_max_retries(client, failing):
+    sent = failing(client, *[AirtableError(503, "unavailable")] * 5)
+    with pytest.raises(AirtableError):
+        client._Airtable__request("GET", "Table 1")
+    assert len(sent) == 4
+
+
+def hangUpServer():
+    """A server that reads each request in full, then closes without replying; returns (url, request count)."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    received = []
+
+    def serve():
+        while True:
+            conn, _ = server.accept()
+            data = b""
+            while b"\r\n\r\n" not in data:
+                data += conn.recv(65536)
+            head, body = data.split(b"\r\n\r\n", 1)
+            length = int([line.split(b":")[1] for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")][0])
+            while len(body) < length:
+                body += conn.recv(65536)
+            received.append(body)
+            conn.close()
+
+    threading.Thread(target = serve, daemon = True).start()
+    return "http://127.0.0.1:%d/v0" % server.getsockname()[1], received
+
+
+def test_post_is_not_retried_when_the_connection_drops_after_sending():
+    url, received = hangUpServer()
+    client = AirtableClient("appTest", "keyTest", rate = 1000, max_retries = 3, backoff = 0, api_url = url)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.batch_create("Table 1", [{"Date": "2026-05-01"}])
+    assert len(received) == 1
+
+
+def test_post_is_retried_when_the_connection_is_refused(monkeypatch):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    client = AirtableClient("appTest", "keyTest", rate = 1000, max_retries = 3, backoff = 0,
+                            api_url = "http://127.0.0.1:%d/v0" % port)
+    sent = []
+    send = client._send
+    monkeypatch.setattr(client, "_send", lambda *args: sent.append(args[0]) or send(*args))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.batch_create("Table 1", [{"Date": "2026-05-01"}])
+    assert sent == ["POST"] * 4
@@ -0,0 +1,60 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from airtable_client import AirtableError
+from airtable_client_async import AsyncAirtable
+
+
+@pytest.fixture
+def client():
+    return AsyncAirtable("appTest", "keyTest", rate = 1000, max_retries = 3, backoff = 0)
+
+
+@pytest.mark.parametrize("error", [
+    asyncio.TimeoutError(),
+    aiohttp.ServerDisconnectedError(),
+    AirtableError(500, "server error")
+])
+def test_post_is_not_retried_once_it_may_have_reached_airtable(client, failing, error):
+    sent = failing(client, error)
+    with pytest.raises(type(error)):
+        asyncio.run(client.create("Table 1", {"Date": "2026-05-01"}))
+    assert sent == ["POST"]
+
+
+@pytest.mark.parametrize("error", [AirtableError(429, "rate limited"), aiohttp.ConnectionTimeoutError()])
+def test_post_is_retried_when_nothing_was_created(client, failing, error):
+    sent = failing(client, error)
+    assert asyncio.run(client.create("Table 1", {"Date": "2026-05-01"})) == {"id": "rec1"}
+    assert sent == ["POST", "POST"]
+
+
+@pytest.mark.parametrize("call", [
+    lambda client: client.get("Table 1"),
+    lambda client: client.delete("Table 1", "rec1")
+], ids = ["GET", "DELETE"])
+@pytest.mark.parametrize("error", [
+    asyncio.TimeoutError(),
+    aiohttp.ServerDisconnectedError(),
+    AirtableError(503, "unavailable"),
+    AirtableError(429, "rate limited")
+])
+def test_get_and_delete_are_retried(client, failing, call, error):
+    sent = failing(client, error)
+    assert asyncio.run(call(client)) == {"id": "rec1"}
+    assert len(sent) == 2
+
+
+def test_every_attempt_waits_for_the_rate_limiter(client, failing):
+    failing(client, AirtableError(429, "rate limited"), AirtableError(429, "rate limited"))
+    asyncio.run(client.get("Table 1"))
+    assert client.rate_limiter.stats()["count"] == 3
+
+
+def test_client_errors_are_not_retried(client, failing):
+    sent = failing(client, AirtableError(422, "invalid"))
+    with pytest.raises(AirtableError):
+        asyncio.run(client.get("Table 1"))
+    assert sent == ["GET"]
@@ -0,0 +1,107 @@
+"""Paginated reads against a local Airtable stub that pages like the real API."""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from airtable_client import AirtableClient
+from airtable_client_async import AsyncAirtable
+
+PAGE_SIZE = 100
+RECORDS = [{"id": "rec%05d" % i, "createdTime": "2026-05-01T00:00:00.000Z", "fields": {
+    "ID": "U%d" % (i % 50), "Date": "2026-05-%02d" % (i % 28 + 1), "Duration": "30分鐘", "Comment": "x" * 40
+}} for i in range(250)]
+
+
+class PagingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self.server.queries.append(query)
+        start = int(query.get("offset", ["0"])[0])
+        size = int(query.get("pageSize", [PAGE_SIZE])[0])
+        fields = query.get("fields[]")
+        page = RECORDS[start:start + size]
+        if fields:
+            page = [dict(record, fields = {k: v for k, v in record["fields"].items() if k in fields}) for record in page]
+        res = {"records": page}
+        if start + size < len(RECORDS):
+            res["offset"] = str(start + size)
+        body = json.dumps(res).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PagingHandler)
+    server.queries = []
+    threading.Thread(target = server.serve_forever, kwargs = {"poll_interval": 0.05}, daemon = True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def apiUrl(server):
+    return "http://127.0.0.1:%d/v0" % server.server_port
+
+
+def syncRead(server, stop_at = None, **kwargs):
+    at = AirtableClient("appTest", "keyTest", rate = 1000, api_url = apiUrl(server))
+    records = []
+    for record in at.iterate("Table 1", **kwargs):
+        records.append(record)
+        if record["id"] == stop_at:
+            break
+    return records
+
+
+def asyncRead(server, stop_at = None, **kwargs):
+    async def read():
+        at = AsyncAirtable("appTest", "keyTest", api_url = apiUrl(server), rate = 1000)
+        records = []
+        try:
+            async for record in at.iterate("Table 1", **kwargs):
+                records.append(record)
+                if record["id"] == stop_at:
+                    break
+        finally:
+            await at.close()
+        return records
+    return asyncio.run(read())
+
+
+@pytest.fixture(params = [syncRead, asyncRead], ids = ["sync", "async"])
+def read(request):
+    return request.param
+
+
+def test_iterate_follows_offset(server, read):
+    records = read(server)
+    assert [record["id"] for record in records] == [record["id"] for record in RECORDS]
+    assert [query.get("offset") for query in server.queries] == [None, ["100"], ["200"]]
+
+
+def test_iterate_sends_field_projection(server, read):
+    records = read(server, fields = ["Date"], filter_by_formula = "{ID} = 'U7'")
+    assert len(server.queries) == 3
+    for query in server.queries:
+        assert query["fields[]"] == ["Date"]
+        assert query["filterByFormula"] == ["{ID} = 'U7'"]
+    assert all(set(record["fields"]) == {"Date"} for record in records)
+
+
+def test_stopping_early_fetches_no_further_page(server, read):
+    records = read(server, stop_at = "rec00007", fields = ["ID"])
+    assert len(records) == 8
+    assert len(server.queries) == 1
@@ -0,0 +1,68 @@
+from concurrent.futures import Future
+
+import pytest
+import requests
+
+from airtable_client import AirtableError, isValidationError
+from batch_writer import BatchWriter
+
+
+class FakeTable:
+    """create_many that records each call and fails as told."""
+
+    def __init__(self, error = None, bad = ()):
+        self.calls = []
+        self.error = error
+        self.bad = set(bad)
+
+    def create_many(self, records):
+        self.calls.append([record["Date"] for record in records])
+        if any(record["Date"] in self.bad for record in records):
+            raise AirtableError(422, "INVALID_VALUE_FOR_COLUMN")
+        if self.error is not None:
+            raise self.error
+        return [dict(record, id = "rec" + record["Date"]) for record in records]
+
+
+def flush(writer, dates):
+    batch = [({"Date": date}, Future()) for date in dates]
+    writer._flush(batch)
+    return [future for _, future in batch]
+
+
+def test_batch_is_sent_in_one_call():
+    table = FakeTable()
+    futures = flush(BatchWriter(table.create_many, split_on = isValidationError), ["1", "2", "3"])
+    assert table.calls == [["1", "2", "3"]]
+    assert [future.result()["id"] for future in futures] == ["rec1", "rec2", "rec3"]
+
+
+def test_validation_error_resends_records_one_by_one():
+    table = FakeTable(bad = ["2"])
+    futures = flush(BatchWriter(table.create_many, split_on = isValidationError), ["1", "2", "3"])
+    assert table.calls == [["1", "2", "3"], ["1"], ["2"], ["3"]]
+    assert futures[0].result()["id"] == "rec1"
+    assert futures[2].result()["id"] == "rec3"
+    with pytest.raises(AirtableError):
+        futures[1].result()
+
+
+@pytest.mark.parametrize("error", [
+    AirtableError(503, "unavailable"),
+    AirtableError(429, "rate limited"),
+    requests.exceptions.ReadTimeout("read timed out")
+])
+def test_other_errors_fail_the_whole_batch_without_resending(error):
+    table = FakeTable(error = error)
+    futures = flush(BatchWriter(table.create_many, split_on = isValidationError), ["1", "2", "3"])
+    assert table.calls == [["1", "2", "3"]]
+    for future in futures:
+        assert future.exception() is error
+
+
+def test_submit_resolves_through_the_writer_thread():
+    table = FakeTable()
+    writer = BatchWriter(table.create_many, max_batch = 2, max_latency = 0.05, split_on = isValidationError)
+    futures = [writer.submit({"Date": date}) for date in ["1", "2", "3"]]
+    assert [future.result(timeout = 5)["id"] for future in futures] == ["rec1", "rec2", "rec3"]
+    assert sum(len(call) for call in table.calls) == 3
@@ -0,0 +1,81 @@
+import logging
+from datetime import date, timedelta
+
+import pytest
+
+import context_store
+import templates
+from bot_logic import BotLogic, isNotRepeat, uploadedDateQuery
+from campaign import Campaign
+from request_log import RequestLogger
+from stats import CampaignStats
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def logic():
+    today = date.fromordinal(Campaign.fromConfig("2026-01-01", "2026-01-01", 3).today())
+    campaign = Campaign.fromConfig((today - timedelta(days = 30)).isoformat(), (today + timedelta(days = 30)).isoformat(), 3)
+    return BotLogic(campaign, context_store.fromConfig("memory", 60), TTLCache(), CampaignStats(),
+                    RequestLogger(sample_rate = 0), admin_user_ids = ["UADMIN"])
+
+
+def localDay(logic, days_ago):
+    return date.fromordinal(logic.campaign.today() - days_ago).isoformat()
+
+
+def test_date_error(logic):
+    assert logic.dateError(logger, localDay(logic, 1), []) is None
+    assert logic.dateError(logger, localDay(logic, 1), [localDay(logic, 1)]) == "運動日期有誤（不能上傳重複日期）"
+    assert "3日前" in logic.dateError(logger, localDay(logic, 4), [])
+    assert "3日前" in logic.dateError(logger, localDay(logic, -1), [])
+
+
+def test_is_not_repeat_without_date_list():
+    # 查詢已上傳日期失敗時 dateList 是 None，視為不能上傳
+    assert not isNotRepeat(logger, "2026-05-01", None)
+
+
+def test_uploaded_date_cache(logic):
+    records = [{"fields": {"Date": "2026-05-01"}}, {"fields": {}}, {"fields": {"Date": "2026-05-03"}}]
+    assert logic.storeUploadedDates("U1", records) == {"2026-05-01", "2026-05-03"}
+    logic.addUploadedDate("U1", "2026-05-02")
+    logic.removeUploadedDate("U1", "2026-05-01")
+    assert logic.cachedUploadedDates(logger, "U1") == ["2026-05-02", "2026-05-03"]
+    assert logic.cachedUploadedDates(logger, "U2") is None
+
+
+def test_uploaded_date_query():
+    assert uploadedDateQuery("U1") == {"fields": ["Date"], "filter_by_formula": "{ID} = 'U1'"}
+
+
+def test_view_context_key(logic):
+    assert logic.viewContextKey({"private_metadata": "key1", "blocks": []}) == "key1"
+    block = {"type": "section"}
+    key = logic.viewContextKey({"private_metadata": "", "blocks": [block]})
+    assert logic.context_store.get(key) == block
+
+
+def test_stats_reply(logic):
+    assert logic.statsReply("U1", []) == {"text": templates.STATS_NOT_READY_TEXT}
+    logic.campaign_stats.rebuild([{"ID": "U1", "Date": localDay(logic, 1), "Duration": "30"}])
+    userReply = logic.statsReply("U1", [])
+    assert logic.statsReply("U1", ["all"]) == userReply
+    assert logic.statsReply("UADMIN", ["all"]) != logic.statsReply("UADMIN", [])
+
+
+@pytest.mark.parametrize("change", [
+    lambda logic: logic.removeUploadedDate("U1", "2026-05-01"),
+    lambda logic: logic.addUploadedDate("U1", "2026-05-02")
+], ids = ["delete", "create"])
+def test_query_started_before_a_change_is_not_cached(logic, change):
+    generation = logic.uploadedDatesGeneration("U1")
+    # 查詢進行中時使用者刪除/新增了一筆紀錄
+    change(logic)
+    logic.storeUploadedDates("U1", [{"fields": {"Date": "2026-05-01"}}], generation)
+    assert logic.cachedUploadedDates(logger, "U1") is None
+    generation = logic.uploadedDatesGeneration("U1")
+    logic.storeUploadedDates("U1", [{"fields": {"Date": "2026-05-03"}}], generation)
+    assert logic.cachedUploadedDates(logger, "U1") == ["2026-05-03"]
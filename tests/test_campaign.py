@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from campaign import Campaign
+
+
+def utc(*args):
+    return datetime(*args, tzinfo = timezone.utc).timestamp()
+
+
+@pytest.fixture
+def campaign():
+    return Campaign.fromConfig("2026-05-01", "2026-05-31", 3)
+
+
+@pytest.mark.parametrize("now, today, tomorrow", [
+    # 當地 00:00～08:00 時 UTC 還是前一天
+    (utc(2026, 5, 9, 15, 59), "2026-05-09", "2026-05-10"),
+    (utc(2026, 5, 9, 16, 0), "2026-05-10", "2026-05-11"),
+    (utc(2026, 5, 9, 23, 59), "2026-05-10", "2026-05-11"),
+    (utc(2026, 5, 10, 0, 0), "2026-05-10", "2026-05-11")
+])
+def test_today_is_local_date(campaign, now, today, tomorrow):
+    assert campaign.isValidDate(today, now = now)
+    assert not campaign.isValidDate(tomorrow, now = now)
+
+
+@pytest.mark.parametrize("sport_date, valid", [
+    ("2026-05-10", True),
+    ("2026-05-07", True),
+    ("2026-05-06", False),
+    ("2026-05-11", False),
+    ("2026-5-10", False),
+    ("", False)
+])
+def test_minus_day_window(campaign, sport_date, valid):
+    # 當地 2026-05-10 07:00
+    assert campaign.isValidDate(sport_date, now = utc(2026, 5, 9, 23, 0)) is valid
+
+
+def test_campaign_start_edge(campaign):
+    now = utc(2026, 5, 1, 16, 30)  # 當地 05-02 00:30
+    assert campaign.isValidDate("2026-05-01", now = now)
+    assert not campaign.isValidDate("2026-04-30", now = now)
+
+
+def test_campaign_end_edge(campaign):
+    now = utc(2026, 6, 1, 1, 0)  # 當地 06-01 09:00，活動已結束一天
+    assert campaign.isValidDate("2026-05-31", now = now)
+    assert not campaign.isValidDate("2026-06-01", now = now)
+    assert not campaign.isValidDate("2026-05-31", now = utc(2026, 6, 3, 16, 0))
+
+
+def test_hint_text(campaign):
+    assert campaign.hint_text == "請填寫5/1～5/31之間的日期，不能重複上傳相同日期，並且只能上傳當日～前3天的日期"
@@ -0,0 +1,56 @@
+import pytest
+
+import config
+import context_store
+
+REQUIRED = {"START_TIME": "2026-05-01", "END_TIME": "2026-05-31"}
+
+
+def check(**environ):
+    env = config.Env(dict(REQUIRED, **environ))
+    env.requireDateRange("START_TIME", "END_TIME")
+    env.getChoice("REQUEST_LOG_LEVEL", "INFO", config.LOG_LEVELS)
+    env.get("CONTEXT_STORE", "inline", context_store.checkSpec)
+    env.check()
+
+
+def test_valid_settings():
+    check(REQUEST_LOG_LEVEL = "WARNING", CONTEXT_STORE = "sqlite:/tmp/context.db")
+    check(END_TIME = "2026-05-01", CONTEXT_STORE = "memory")
+
+
+@pytest.mark.parametrize("environ, message", [
+    ({"REQUEST_LOG_LEVEL": "VERBOSE"}, "REQUEST_LOG_LEVEL='VERBOSE' must be one of DEBUG, INFO, WARNING, ERROR, CRITICAL"),
+    ({"CONTEXT_STORE": "redis"}, "CONTEXT_STORE='redis' is not valid"),
+    ({"CONTEXT_STORE": "sqlite:"}, "CONTEXT_STORE='sqlite:' is not valid"),
+    ({"END_TIME": "2026-04-30"}, "START_TIME=2026-05-01 is after END_TIME=2026-04-30"),
+    ({"END_TIME": "2026-13-01"}, "END_TIME='2026-13-01' is not valid")
+])
+def test_invalid_settings_fail_check(environ, message):
+    with pytest.raises(config.ConfigError, match = message.replace("(", r"\(")):
+        check(**environ)
+
+
+def test_all_errors_are_reported_together():
+    with pytest.raises(config.ConfigError) as e:
+        check(REQUEST_LOG_LEVEL = "loud", CONTEXT_STORE = "redis", END_TIME = "2026-04-01")
+    assert len(str(e.value).splitlines()) == 4
+
+
+def test_invalid_value_falls_back_to_default():
+    env = config.Env({"CONTEXT_STORE": "redis", "REQUEST_LOG_LEVEL": "loud"})
+    assert env.get("CONTEXT_STORE", "inline", context_store.checkSpec) == "inline"
+    assert env.getChoice("REQUEST_LOG_LEVEL", "INFO", config.LOG_LEVELS) == "INFO"
+
+
+def test_missing_dates_are_reported_once():
+    env = config.Env({})
+    assert env.requireDateRange("START_TIME", "END_TIME") == (None, None)
+    assert env.errors == ["START_TIME is not set", "END_TIME is not set"]
+
+
+def test_expect_records_failed_cross_setting_checks():
+    env = config.Env({})
+    env.expect(1 < 5, "never reported")
+    env.expect(5 < 5, "AIRTABLE_BACKGROUND_RATE_LIMIT must be above 0 and below AIRTABLE_RATE_LIMIT")
+    assert env.errors == ["AIRTABLE_BACKGROUND_RATE_LIMIT must be above 0 and below AIRTABLE_RATE_LIMIT"]
@@ -0,0 +1,20 @@
+import pytest
+
+import config
+from export_records import exportRate, main
+
+
+@pytest.mark.parametrize("environ, rate", [
+    ({}, 1),
+    ({"AIRTABLE_RATE_LIMIT": "2.5"}, 0.5),
+    ({"AIRTABLE_RATE_LIMIT": "5", "EXPORT_RATE_LIMIT": "0.2"}, 0.2)
+])
+def test_export_rate_is_a_fraction_of_the_bot_budget(environ, rate):
+    assert exportRate(config.Env(environ)) == pytest.approx(rate)
+
+
+def test_missing_settings_exit_before_reading(monkeypatch, tmp_path):
+    for name in ("AIRTABLE_BASE", "AIRTABLE_API_KEY", "AIRTABLE_NAME", "EXPORT_RATE_LIMIT"):
+        monkeypatch.delenv(name, raising = False)
+    with pytest.raises(SystemExit, match = "AIRTABLE_BASE is not set"):
+        main([str(tmp_path / "records.csv")])
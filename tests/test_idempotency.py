@@ -0,0 +1,32 @@
+from idempotency import Deduplicator, requestKey
+
+
+def submission(date, view_hash = "h1"):
+    return {"type": "view_submission", "view": {"id": "V1", "hash": view_hash,
+            "state": {"values": {"sport_date": {"sport_date_action": {"selected_date": date}}}}}}
+
+
+def test_retried_submission_is_a_duplicate():
+    deduplicator = Deduplicator()
+    assert not deduplicator.isDuplicate(submission("2026-05-01"))
+    assert deduplicator.isDuplicate(submission("2026-05-01"))
+    # 修改內容後重新送出不是重複
+    assert not deduplicator.isDuplicate(submission("2026-05-02"))
+
+
+def test_forgotten_submission_is_handled_again():
+    # 被 response_action: errors 擋下後原封不動再送出
+    deduplicator = Deduplicator()
+    assert not deduplicator.isDuplicate(submission("2026-05-01"))
+    deduplicator.forget(submission("2026-05-01"))
+    assert not deduplicator.isDuplicate(submission("2026-05-01"))
+    assert deduplicator.isDuplicate(submission("2026-05-01"))
+
+
+def test_events_without_key_are_never_duplicates():
+    deduplicator = Deduplicator()
+    body = {"type": "block_actions"}
+    assert requestKey(body) is None
+    assert not deduplicator.isDuplicate(body)
+    deduplicator.forget(body)
+    assert not deduplicator.isDuplicate(body)
@@ -0,0 +1,63 @@
+import pytest
+
+from mirror import AirtableMirror
+
+
+class FakeAirtable:
+    """iterate() over ``records``, calling ``during_scan`` after the first record."""
+
+    def __init__(self, records):
+        self.records = records
+        self.during_scan = None
+
+    def iterate(self, table_name, fields = [], filter_by_formula = None):
+        for i, record in enumerate(self.records):
+            yield record
+            if i == 0 and self.during_scan is not None:
+                self.during_scan()
+
+
+def record(record_id, user_id, date):
+    return {"id": record_id, "fields": {"ID": user_id, "Date": date}}
+
+
+@pytest.fixture
+def table():
+    return FakeAirtable([record("rec1", "U1", "2026-05-01"), record("rec2", "U1", "2026-05-02")])
+
+
+@pytest.fixture
+def mirror(tmp_path, table):
+    mirror = AirtableMirror(str(tmp_path / "mirror.db"), table, "Table 1")
+    mirror.sync()
+    return mirror
+
+
+def test_full_sync_removes_records_deleted_in_airtable(mirror, table):
+    table.records = table.records[:1]
+    mirror.ready = False  # 下一次改做全量同步
+    mirror.sync()
+    assert mirror.uploadedDates("U1") == {"2026-05-01"}
+
+
+def test_commit_during_full_sync_is_kept(mirror, table):
+    def submit():
+        token = mirror.reserve("U1", "2026-05-03")
+        mirror.commit(token, "rec3", {"ID": "U1", "Date": "2026-05-03"})
+
+    # 掃描已經過了 rec3 所在的頁面才 commit
+    table.during_scan = submit
+    mirror.ready = False
+    mirror.sync()
+    assert mirror.uploadedDates("U1") == {"2026-05-01", "2026-05-02", "2026-05-03"}
+    # (ID, Date) 仍然擋得住重複上傳
+    assert mirror.reserve("U1", "2026-05-03") is None
+
+
+def test_reserve_rejects_taken_date(mirror):
+    assert mirror.reserve("U1", "2026-05-01") is None
+    token = mirror.reserve("U1", "2026-05-04")
+    assert token is not None
+    assert mirror.reserve("U1", "2026-05-04") is None
+    mirror.release(token)
+    assert mirror.reserve("U1", "2026-05-04") is not None
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+import rate_limit
+from rate_limit import TokenBucket
+
+
+class FakeClock:
+    """Stands in for the ``time`` module; ``sleep`` only moves the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+@pytest.mark.parametrize("rate", [5 / 8, 0.1, 1, 5])
+def test_capacity_holds_at_least_one_token(rate):
+    assert TokenBucket(rate).capacity >= 1
+
+
+def test_fractional_rate_acquire_returns(clock):
+    # AIRTABLE_RATE_LIMIT = 5 / WEB_CONCURRENCY，8 個 worker 時每秒不到一個 token
+    bucket = TokenBucket(5 / 8)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(8 / 5)
+    assert clock.sleeps == [pytest.approx(8 / 5)]
+
+
+def test_fractional_rate_acquire_async_returns(clock, monkeypatch):
+    async def sleep(seconds):
+        clock.sleep(seconds)
+
+    async def acquireTwice(bucket):
+        return await bucket.acquireAsync(), await bucket.acquireAsync()
+
+    bucket = TokenBucket(5 / 8)
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", sleep)
+    first, second = asyncio.run(acquireTwice(bucket))
+    assert first == 0
+    assert second == pytest.approx(8 / 5)
+
+
+def test_burst_up_to_capacity_then_wait(clock):
+    bucket = TokenBucket(2, capacity = 3)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert bucket.stats()["count"] == 4
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import metrics
+from single_flight import AsyncSingleFlight, SingleFlight
+
+N = 8
+
+
+def waitFor(condition, timeout = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def runThreads(flight, func):
+    """Call ``flight.do`` from N threads; returns each thread's result or exception."""
+    results = [None] * N
+
+    def worker(i):
+        try:
+            results[i] = flight.do("U1", func)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target = worker, args = (i,)) for i in range(N)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_threads_share_one_call():
+    flight = SingleFlight("test_threads_share")
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait(5)
+        return ["2026-05-01"]
+
+    threads, results = runThreads(flight, func)
+    # 其他 N-1 個執行緒都加入進行中的呼叫後才讓它完成
+    waitFor(lambda: metrics.COALESCED.value(name = "test_threads_share") == N - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert results == [["2026-05-01"]] * N
+
+
+def test_thread_exception_reaches_every_waiter():
+    flight = SingleFlight("test_threads_error")
+    release = threading.Event()
+    error = RuntimeError("airtable down")
+
+    def func():
+        release.wait(5)
+        raise error
+
+    threads, results = runThreads(flight, func)
+    waitFor(lambda: metrics.COALESCED.value(name = "test_threads_error") == N - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert all(result is error for result in results)
+
+
+def test_next_call_after_finish_is_not_coalesced():
+    flight = SingleFlight("test_threads_fresh")
+    assert flight.do("U1", lambda: 1) == 1
+    assert flight.do("U1", lambda: 2) == 2
+    assert metrics.COALESCED.value(name = "test_threads_fresh") == 0
+
+
+def test_tasks_share_one_call():
+    flight = AsyncSingleFlight("test_tasks_share")
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["2026-05-01"]
+
+    async def main():
+        return await asyncio.gather(*[flight.do("U1", func) for _ in range(N)])
+
+    assert asyncio.run(main()) == [["2026-05-01"]] * N
+    assert len(calls) == 1
+    assert metrics.COALESCED.value(name = "test_tasks_share") == N - 1
+
+
+def test_task_exception_reaches_every_waiter():
+    flight = AsyncSingleFlight("test_tasks_error")
+    error = RuntimeError("airtable down")
+
+    async def func():
+        await asyncio.sleep(0.01)
+        raise error
+
+    async def main():
+        return await asyncio.gather(*[flight.do("U1", func) for _ in range(N)], return_exceptions = True)
+
+    assert all(result is error for result in asyncio.run(main()))
+    assert metrics.COALESCED.value(name = "test_tasks_error") == N - 1
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = AsyncSingleFlight("test_tasks_cancel")
+
+    async def func():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("U1", func))
+        second = asyncio.ensure_future(flight.do("U1", func))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
@@ -0,0 +1,46 @@
+import copy
+import time
+
+import pytest
+from slack_sdk import WebClient
+
+import metrics
+from slack_client import InstrumentedWebClient, TierLimiter
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(WebClient, "api_call", lambda self, api_method, **kwargs: {"ok": True})
+    limiter = TierLimiter(tiers = {"views.update": 2})
+    bucket = limiter.buckets["views.update"]
+    while bucket.tryAcquire():
+        pass
+    return limiter
+
+
+def test_drained_bucket_does_not_delay_request_thread_calls(limiter):
+    # Bolt 傳給 ack 那一側 listener 的 client
+    client = InstrumentedWebClient(token = "xoxb-test", rate_limiter = limiter, queue_calls = False)
+    overBudget = metrics.SLACK_OVER_BUDGET.value(method = "views.update")
+    start = time.monotonic()
+    for _ in range(5):
+        client.api_call("views.update")
+    assert time.monotonic() - start < 0.5
+    assert metrics.SLACK_OVER_BUDGET.value(method = "views.update") == overBudget + 5
+
+
+def test_lazy_listener_copy_queues_for_the_tier(limiter, monkeypatch):
+    client = InstrumentedWebClient(token = "xoxb-test", rate_limiter = limiter, queue_calls = False)
+    lazyClient = copy.deepcopy(client)
+    assert lazyClient.rate_limiter is limiter and lazyClient.queue_calls
+    waits = []
+    monkeypatch.setattr(limiter.buckets["views.update"], "acquire", lambda: waits.append(1) or 0.0)
+    lazyClient.api_call("views.update")
+    assert waits == [1]
+
+
+def test_untiered_methods_never_wait(limiter):
+    client = InstrumentedWebClient(token = "xoxb-test", rate_limiter = limiter)
+    start = time.monotonic()
+    client.api_call("views.open")
+    assert time.monotonic() - start < 0.5
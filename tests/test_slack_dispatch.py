@@ -0,0 +1,49 @@
+import pytest
+
+from slack_dispatch import planCalls
+
+UPDATE = ("chat_update", {"channel": "D1", "ts": "1.0", "text": "old", "attachments": []})
+POST = ("chat_postMessage", {"channel": "U1", "text": "deleted"})
+
+
+def updated(text):
+    return ("chat_update", dict(UPDATE[1], text = text))
+
+
+@pytest.mark.parametrize("calls, planned, saved", [
+    # 純文字私訊併進同一個 DM 的 chat_update
+    ([POST, UPDATE], [updated("deleted")], 1),
+    ([UPDATE, ("chat_postMessage", {"channel": "D1", "text": "deleted"})], [updated("deleted")], 1),
+    # 有 blocks / attachments / thread_ts 的訊息不能合併
+    ([("chat_postMessage", dict(POST[1], blocks = [])), UPDATE], [("chat_postMessage", dict(POST[1], blocks = [])), UPDATE], 0),
+    ([("chat_postMessage", dict(POST[1], attachments = [])), UPDATE], [("chat_postMessage", dict(POST[1], attachments = [])), UPDATE], 0),
+    ([("chat_postMessage", dict(POST[1], thread_ts = "1.0")), UPDATE], [("chat_postMessage", dict(POST[1], thread_ts = "1.0")), UPDATE], 0),
+    # 更新的不是 DM，或私訊給別人
+    ([POST, ("chat_update", dict(UPDATE[1], channel = "C1"))], [POST, ("chat_update", dict(UPDATE[1], channel = "C1"))], 0),
+    ([("chat_postMessage", {"channel": "U2", "text": "hi"}), UPDATE], [("chat_postMessage", {"channel": "U2", "text": "hi"}), UPDATE], 0),
+    # 沒有 chat_update 時照常送出
+    ([POST], [POST], 0),
+])
+def test_fold(calls, planned, saved):
+    assert planCalls(calls, "U1") == (planned, saved)
+
+
+def test_identical_calls_are_sent_once():
+    views = ("views_update", {"view_id": "V1", "view": {"blocks": [1, 2]}})
+    other = ("views_update", {"view_id": "V1", "view": {"blocks": [1]}})
+    assert planCalls([views, other, views, views], "U1") == ([views, other], 2)
+
+
+def test_order_is_preserved():
+    calls = [("views_open", {"trigger_id": "t"}), ("chat_postMessage", {"channel": "U1", "blocks": []}),
+             ("chat_delete", {"channel": "D1", "ts": "2.0"}), ("views_open", {"trigger_id": "t"}),
+             ("reactions_add", {"name": "ok"})]
+    planned, saved = planCalls(calls, "U1")
+    assert [method for method, _ in planned] == ["views_open", "chat_postMessage", "chat_delete", "reactions_add"]
+    assert saved == 1
+
+
+def test_folding_does_not_modify_the_queued_calls():
+    update = ("chat_update", dict(UPDATE[1]))
+    planCalls([POST, update], "U1")
+    assert update[1]["text"] == "old"
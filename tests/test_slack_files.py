@@ -0,0 +1,73 @@
+import pytest
+
+import slack_files
+
+THUMBS = {"thumb_360": "t360", "thumb_480": "t480", "thumb_720": "t720", "url_private": "orig"}
+
+
+@pytest.mark.parametrize("width, expected", [
+    (1080, "t720"),
+    (720, "t720"),
+    (719, "t480"),
+    (480, "t480"),
+    (479, "t360"),
+    (360, "t360"),
+    (359, "orig"),
+    (0, "orig")
+])
+def test_select_thumbnail_by_width(width, expected):
+    assert slack_files.selectThumbnail(dict(THUMBS, original_w = width)) == expected
+
+
+@pytest.mark.parametrize("missing, expected", [
+    ("thumb_720", "t480"),
+    ("thumb_480", "t720"),
+    ("url_private", "t720")
+])
+def test_select_thumbnail_skips_missing_thumbnail(missing, expected):
+    file = dict(THUMBS, original_w = 1080)
+    del file[missing]
+    assert slack_files.selectThumbnail(file) == expected
+
+
+def test_select_thumbnail_falls_back_to_next_size():
+    file = {"original_w": 1080, "thumb_360": "t360", "url_private": "orig"}
+    assert slack_files.selectThumbnail(file) == "t360"
+
+
+@pytest.mark.parametrize("original_w", [None, "missing"])
+def test_select_thumbnail_without_original_width(original_w):
+    file = dict(THUMBS)
+    if original_w != "missing":
+        file["original_w"] = original_w
+    assert slack_files.selectThumbnail(file) == "orig"
+
+
+@pytest.mark.parametrize("file, expected", [
+    ({"mimetype": "image/png", "original_w": 800, "url_private": "u", "name": "a.png", "title": "a", "size": 1},
+     {"mimetype": "image/png", "original_w": 800, "url_private": "u", "name": "a.png"}),
+    ({"mimetype": "application/pdf", "url_private": "u", "name": "a.pdf"},
+     {"mimetype": "application/pdf", "url_private": "u", "name": "a.pdf"}),
+    ({}, {})
+])
+def test_file_subset(file, expected):
+    assert slack_files.fileSubset(file) == expected
+
+
+@pytest.mark.parametrize("file, expected", [
+    ({"mimetype": "image/jpeg"}, True),
+    ({"mimetype": "application/pdf"}, False),
+    ({}, False)
+])
+def test_is_image(file, expected):
+    assert slack_files.isImage(file) is expected
+
+
+@pytest.mark.parametrize("channel_id, file_id, expected", [
+    ("D0123", "F0USER", True),
+    ("C0123", "F0USER", False),
+    ("G0123", "F0USER", False)
+] + [("D0123", file_id, False) for file_id in sorted(slack_files.TUTORIAL_FILE_IDS)])
+def test_is_user_upload(channel_id, file_id, expected):
+    # 教學檔案不需要查 files_info
+    assert slack_files.isUserUpload({"channel_id": channel_id, "file_id": file_id}) is expected